@@ -1,36 +1,261 @@
 import os
-import json
+import threading
+import time
+
+# Timed from the top of the script so the first run in a process includes the module imports
+SCRIPT_STARTED = time.perf_counter()
+
 import streamlit as st
-import pandas as pd
 from dotenv import load_dotenv
-import google.generativeai as genai
 
 from components.chatbot import FootballChatbot
 from components.analysis_tool import FootballAnalysisTool
 from utils.memory_manager import SharedMemory
+from utils.memory_backends import SQLiteBackend
+from utils.response_cache import ResponseCache
+from utils.llm_client import LLMClient
+from utils.resilience import AdaptiveConcurrency, CircuitBreaker, TokenBucket
+from utils.player_repository import load_player_repository
+from utils.context_builder import ContextBuilder
+from utils.metrics_engine import MetricsEngine
+from utils.similarity import SimilarityEngine
+from utils.transcript import Transcript
+from utils.instrumentation import perf
+from utils.analysis_jobs import AnalysisJobQueue
+
+# Load environment variables (once per process)
+@st.cache_resource(show_spinner=False)
+def load_environment():
+    load_dotenv()
 
-# Load environment variables
-load_dotenv()
+load_environment()
 
-# Initialize the Google API client correctly
 api_key = os.getenv("GOOGLE_API_KEY")
 
 if not api_key:
     st.error("❌ Missing Google API Key. Please check your .env file or Streamlit secrets.")
-else:
-    genai.configure(api_key=api_key)  # ✅ Correct setup
 
-# Load player data
+# Import and configure the Gemini SDK on first use; the import is the slowest part of a cold start
+def load_genai():
+    import google.generativeai as genai
+    
+    if api_key:
+        genai.configure(api_key=api_key)  # ✅ Correct setup
+    return genai
+
+# Optional binary cache of the parsed player records for fast cold starts
+PLAYER_DATA_CACHE = os.getenv("PLAYER_DATA_CACHE") or None
+
+# Load player data (parsed once and shared across sessions; file edits are applied per player)
+@perf.timed("load_player_data_seconds")
 def load_player_data():
-    with open('data.json', 'r', encoding='utf-8') as f:
-        return json.load(f)
+    path = os.path.abspath(os.getenv("PLAYER_DATA_PATH", "data.json"))
+    
+    # Register change listeners before the load that may detect an edit
+    watch_player_data(path)
+    get_metrics_engine(path)
+    get_similarity_engine(path)
+    
+    return load_player_repository(path, cache_path=PLAYER_DATA_CACHE)
+
+# Forget stored and cached analyses of players whose data changed on disk
+@st.cache_resource
+def watch_player_data(path):
+    repository = load_player_repository(path, cache_path=PLAYER_DATA_CACHE)
+    memory = get_shared_memory()
+    cache = get_response_cache()
+    
+    def on_change(changes):
+        for player_id in changes.changed + changes.removed:
+            memory.remove_analyzed_player(player_id)
+            cache.invalidate_tag(player_id)
+    
+    repository.subscribe(on_change)
+    return repository
+
+# Build cohort metrics once and keep them in step with data reloads
+@st.cache_resource
+def get_metrics_engine(path):
+    repository = load_player_repository(path, cache_path=PLAYER_DATA_CACHE)
+    engine = MetricsEngine(repository.players)
+    
+    def on_change(changes):
+        engine.apply_changes(
+            [repository.get(player_id) for player_id in changes.added + changes.changed],
+            removed_ids=changes.removed
+        )
+    
+    repository.subscribe(on_change)
+    return engine
+
+# Build the similar-player matrix once and keep it in step with data reloads
+@st.cache_resource
+def get_similarity_engine(path):
+    repository = load_player_repository(path, cache_path=PLAYER_DATA_CACHE)
+    engine = SimilarityEngine(repository.players)
+    
+    def on_change(changes):
+        engine.apply_changes(
+            [repository.get(player_id) for player_id in changes.added + changes.changed],
+            removed_ids=changes.removed
+        )
+    
+    repository.subscribe(on_change)
+    return engine
 
 # Initialize shared memory
 @st.cache_resource
 def get_shared_memory():
+    if os.getenv("MEMORY_BACKEND", "memory") == "sqlite":
+        return SharedMemory(SQLiteBackend(os.getenv("MEMORY_DB_PATH", "shared_memory.sqlite3")))
     return SharedMemory()
 
+# Initialize the relevance-ranked chat context index over shared memory
+@st.cache_resource
+def get_context_builder():
+    return ContextBuilder(
+        get_shared_memory(),
+        token_budget=int(os.getenv("CHAT_CONTEXT_TOKENS", "1500")),
+        top_k=int(os.getenv("CHAT_CONTEXT_TOP_K", "8"))
+    )
+
+# Initialize the persistent LLM response cache and the shared client
+@st.cache_resource
+def get_response_cache():
+    cache = ResponseCache(
+        path=os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite3"),
+        ttl=int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600))),
+        max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+    )
+    
+    # Expose cache effectiveness alongside the latency metrics
+    def cache_gauges():
+        stats = cache.stats()
+        return {
+            "llm_cache_hit_rate": stats["hit_rate"],
+            "llm_cache_entries": stats["entries"],
+            "llm_cache_evictions": stats["evictions"],
+        }
+    
+    perf.add_collector(cache_gauges)
+    return cache
+
+# Background analysis workers shared by every session, so jobs outlive reruns
+@st.cache_resource
+def get_analysis_queue():
+    return AnalysisJobQueue(max_workers=int(os.getenv("ANALYSIS_MAX_CONCURRENCY", "4")))
+
+@st.cache_resource
+def get_llm_client():
+    rpm = float(os.getenv("LLM_RATE_LIMIT_RPM", "1000"))
+    concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+    client = LLMClient(
+        client_factory=load_genai,
+        cache=get_response_cache(),
+        rate_limiter=TokenBucket(rpm / 60, capacity=float(os.getenv("LLM_RATE_LIMIT_BURST", "20"))) if rpm > 0 else None,
+        concurrency=AdaptiveConcurrency(initial=concurrency, maximum=concurrency * 4),
+        breaker=CircuitBreaker(
+            failure_threshold=int(os.getenv("LLM_BREAKER_THRESHOLD", "5")),
+            reset_timeout=float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+        ),
+        max_retries=int(os.getenv("LLM_MAX_RETRIES", "3"))
+    )
+    
+    # Expose the adaptive limit, breaker state and shared requests next to the latency metrics
+    perf.add_collector(lambda: {
+        "llm_concurrency_limit": client.concurrency.limit,
+        "llm_in_flight": client.concurrency.in_flight,
+        "llm_circuit_open": int(client.breaker.state != CircuitBreaker.CLOSED),
+        "llm_single_flight_in_flight": client.flights.in_flight,
+        "llm_single_flight_shared_total": client.flights.followers,
+    })
+    
+    # Pre-warm: load the SDK in the background while the first page renders
+    threading.Thread(target=client.warm_up, name="llm-warm-up", daemon=True).start()
+    return client
+
+# The analysis tool and chatbot keep no per-session state, so one instance serves every session
+@st.cache_resource
+def get_analysis_tool(path):
+    data = load_player_repository(path, cache_path=PLAYER_DATA_CACHE)
+    return FootballAnalysisTool(
+        get_llm_client(), data, get_shared_memory(),
+        max_concurrency=int(os.getenv("ANALYSIS_MAX_CONCURRENCY", "4")),
+        batch_size=int(os.getenv("ANALYSIS_BATCH_SIZE", "1")),
+        metrics=get_metrics_engine(path),
+        jobs=get_analysis_queue(),
+        team_chunk_size=int(os.getenv("TEAM_ANALYSIS_CHUNK_SIZE", "12"))
+    )
+
+@st.cache_resource
+def get_chatbot(path):
+    data = load_player_repository(path, cache_path=PLAYER_DATA_CACHE)
+    return FootballChatbot(
+        get_llm_client(), data, get_shared_memory(),
+        context_builder=get_context_builder(),
+        similarity=get_similarity_engine(path)
+    )
+
+# Latency histograms and the Prometheus text file behind the Performance tab
+PERF_METRICS_PATH = os.getenv("PERF_METRICS_PATH", "perf_metrics.prom")
+
+def render_performance_tab():
+    # pandas is only needed for the tables on this tab and the Database tab
+    import pandas as pd
+    
+    st.title("Performance")
+    
+    if not perf.enabled:
+        st.info("Instrumentation is disabled (PERF_METRICS=0).")
+        return
+    
+    rows = perf.snapshot()
+    if not rows:
+        st.info("No measurements recorded yet.")
+        return
+    
+    st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+    
+    latency_metrics = [
+        (name, labels) for name, labels in perf.histogram_names() if name.endswith("_seconds")
+    ]
+    if latency_metrics:
+        choice = st.selectbox(
+            "Latency histogram",
+            latency_metrics,
+            format_func=lambda key: key[0] + (f" ({', '.join(f'{k}={v}' for k, v in key[1])})" if key[1] else "")
+        )
+        buckets = perf.histogram_buckets(choice[0], dict(choice[1]))
+        st.bar_chart(pd.DataFrame(buckets, columns=["seconds", "count"]).set_index("seconds"))
+    
+    st.caption(f"Prometheus metrics are written to {os.path.abspath(PERF_METRICS_PATH)}")
+    st.download_button("Download metrics", perf.export_prometheus(), file_name="perf_metrics.prom")
+
+# Chat history: messages kept per session, and how many render before "show earlier"
+CHAT_HISTORY_MAX_MESSAGES = int(os.getenv("CHAT_HISTORY_MAX_MESSAGES", "200"))
+CHAT_HISTORY_PAGE = int(os.getenv("CHAT_HISTORY_PAGE", "20"))
+
+def render_chat_history(transcript):
+    """Render the newest messages, with older ones loaded a page at a time on request"""
+    shown = st.session_state.get("chat_history_shown", CHAT_HISTORY_PAGE)
+    hidden = len(transcript) - shown
+    
+    if hidden > 0:
+        if st.button(f"Show {min(hidden, CHAT_HISTORY_PAGE)} earlier messages", key="chat_history_more"):
+            st.session_state.chat_history_shown = shown + CHAT_HISTORY_PAGE
+            st.rerun()
+    elif transcript.compacted:
+        st.caption(f"{transcript.compacted} older messages were cleared to keep the session light.")
+    
+    for message in transcript.recent(shown):
+        with st.chat_message(message["role"]):
+            st.markdown(message["content"])
+
+@perf.timed("rerun_seconds")
 def main():
+    # Export what earlier reruns recorded (throttled, so reruns stay cheap)
+    perf.write_prometheus(PERF_METRICS_PATH, min_interval=float(os.getenv("PERF_METRICS_INTERVAL", "10")))
+    
     st.set_page_config(
         page_title="Football Analyst Chatbot",
         page_icon="⚽",
@@ -44,18 +269,18 @@ def main():
         st.session_state.team_analysis = None
     if "active_tab" not in st.session_state:
         st.session_state.active_tab = "chat"
-    if "messages" not in st.session_state:
-        st.session_state.messages = []
+    if "transcript" not in st.session_state:
+        st.session_state.transcript = Transcript(max_messages=CHAT_HISTORY_MAX_MESSAGES)
     if "analysis_mode" not in st.session_state:
         st.session_state.analysis_mode = False
     if "selected_players" not in st.session_state:
         st.session_state.selected_players = []
     
     # Initialize components
-    memory = get_shared_memory()
     data = load_player_data()
-    analysis_tool = FootballAnalysisTool(genai, data, memory)  # Use genai directly
-    chatbot = FootballChatbot(genai, data, memory)  # Use genai directly
+    llm_client = get_llm_client()
+    analysis_tool = get_analysis_tool(data.path)
+    chatbot = get_chatbot(data.path)
     
     # Sidebar for player selection only (no analyze button)
     with st.sidebar:
@@ -65,7 +290,7 @@ def main():
         
         # Tab selection in sidebar
         st.subheader("Navigation")
-        col1, col2 = st.columns(2)
+        col1, col2, col3 = st.columns(3)
         with col1:
             if st.button("Chat", use_container_width=True, 
                       type="primary" if st.session_state.active_tab == "chat" else "secondary"):
@@ -78,6 +303,15 @@ def main():
                       type="primary" if st.session_state.active_tab == "database" else "secondary"):
                 st.session_state.active_tab = "database"
                 st.rerun()
+        
+        with col3:
+            if st.button("Performance", use_container_width=True,
+                      type="primary" if st.session_state.active_tab == "performance" else "secondary"):
+                st.session_state.active_tab = "performance"
+                st.rerun()
+        
+        cache_stats = llm_client.cache.stats()
+        st.caption(f"LLM cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses")
     
     # Handle tab switching logic
     if hasattr(st.session_state, "start_analysis") and st.session_state.start_analysis:
@@ -87,17 +321,18 @@ def main():
     
     # Choose what to display
     if st.session_state.active_tab == "database":
+        # The table components (and pandas) are imported on the first visit to this tab
+        from components.player_table import PlayerTable
+        from components.similar_players import SimilarPlayers
+        
         st.title("Player Database")
-        player_df = pd.DataFrame([
-            {
-                "Name": p.get("name", "Unknown"),
-                "Age": p.get("age", "N/A"),
-                "Position": p.get("position", "Unknown"),
-                "Club": p.get("clubName", "Unknown")
-            }
-            for p in data.get("data", [])
-        ])
-        st.dataframe(player_df, use_container_width=True)
+        PlayerTable(data).render()
+        
+        st.subheader("Similar Players")
+        SimilarPlayers(data, get_similarity_engine(data.path)).render()
+    
+    elif st.session_state.active_tab == "performance":
+        render_performance_tab()
     
     elif st.session_state.analysis_mode:
         st.title("Analysis in Progress")
@@ -110,36 +345,58 @@ def main():
     else:
         st.title("Football Analyst Chat")
         
-        if not st.session_state.messages:
+        # Pick up results a background analysis finished while this tab was open
+        analysis_tool.render_job_status()
+        
+        transcript = st.session_state.transcript
+        if not transcript and not transcript.compacted:
             st.info("👋 Type a message below to start chatting with the Football Analyst")
         
-        for message in st.session_state.messages:
-            with st.chat_message(message["role"]):
-                st.markdown(message["content"])
+        render_chat_history(transcript)
         
         player_count = len(st.session_state.selected_players)
         analyze_button_label = f"Analyze {player_count} Players" if player_count > 0 else "No Players Selected"
         
         if st.button(analyze_button_label, disabled=player_count == 0, type="primary"):
+            analysis_tool.cancel_job()
             st.session_state.start_analysis = True
             st.session_state.analysis_results = []
             st.session_state.team_analysis = None
+            st.session_state.pop("chat_history_shown", None)
             st.rerun()
         
         prompt = st.chat_input("Ask about players, teams, or analysis...")
         
         if prompt:
-            st.session_state.messages.append({"role": "user", "content": prompt})
+            transcript.add("user", prompt)
+            # A new message returns the history to its newest page
+            st.session_state.pop("chat_history_shown", None)
             
             with st.chat_message("user"):
                 st.markdown(prompt)
             
             with st.chat_message("assistant"):
-                with st.spinner("Thinking..."):
-                    response = chatbot.generate_response(prompt)
-                    st.markdown(response)
+                placeholder = st.empty()
+                response = ""
+                for chunk in chatbot.stream_response(prompt):
+                    response += chunk
+                    placeholder.markdown(response + "▌")
+                placeholder.markdown(response)
             
-            st.session_state.messages.append({"role": "assistant", "content": response})
+            transcript.add("assistant", response)
+
+# Flags shared by every script run in this process
+@st.cache_resource
+def process_state():
+    return {"cold": True}
+
+def record_script_time():
+    """Record the first script run in this process (imports included) as the cold start"""
+    if process_state().pop("cold", False):
+        perf.observe("cold_start_seconds", time.perf_counter() - SCRIPT_STARTED)
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    finally:
+        record_script_time()
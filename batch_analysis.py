@@ -0,0 +1,217 @@
+"""
+Headless batch analysis. Reuses FootballAnalysisTool's prompts and the
+background job queue without the Streamlit UI, writing one JSON line per
+player as analyses complete.
+
+    python batch_analysis.py --output analyses.jsonl --concurrency 8
+    python batch_analysis.py --category Defenders --memory-db shared_memory.sqlite3
+
+Players already in the output file are skipped, so an interrupted run can
+simply be restarted. With --memory-db the results are also loaded into the
+SQLite SharedMemory store used by the app (MEMORY_BACKEND=sqlite).
+
+--dry-run swaps in the offline fake client. It needs an explicit --output,
+never touches the LLM cache or a SharedMemory store, and marks its records
+so real runs don't count them as done.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from dotenv import load_dotenv
+
+from components.analysis_tool import FootballAnalysisTool
+from utils.analysis_jobs import AnalysisJobQueue, DONE, ERROR
+from utils.llm_client import DEFAULT_MODEL, LLMClient
+from utils.memory_backends import SQLiteBackend
+from utils.memory_manager import SharedMemory
+from utils.metrics_engine import MetricsEngine
+from utils.player_repository import load_player_repository, position_category
+from utils.resilience import AdaptiveConcurrency, CircuitBreaker, TokenBucket
+from utils.response_cache import ResponseCache
+
+def read_done(path, dry_run=False):
+    """Completed records already in an output file (from runs of the same kind), keyed by player id"""
+    done = {}
+    if not os.path.exists(path):
+        return done
+    
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A line cut off by an interrupted run is simply redone
+                continue
+            if record.get("status") == "ok" and bool(record.get("dry_run")) == dry_run:
+                done[str(record["id"])] = record
+    return done
+
+def select_players(repository, args):
+    """Players matching the command-line filters, in file order"""
+    players = repository.search(args.query) if args.query else list(repository.players)
+    if args.ids:
+        wanted = {str(player_id) for player_id in args.ids}
+        players = [player for player in players if str(player.get("id")) in wanted]
+    if args.category:
+        players = [player for player in players if position_category(player.get("position", "Unknown")) in args.category]
+    if args.club:
+        players = [player for player in players if player.get("clubName") in args.club]
+    if args.limit:
+        players = players[:args.limit]
+    return players
+
+def make_client(args):
+    """LLM client for the run: the fake client for dry runs, Gemini otherwise"""
+    if args.dry_run:
+        from benchmarks.fake_genai import FakeGenAI
+        genai = FakeGenAI(latency=0.05, first_token_latency=0.01)
+    else:
+        import google.generativeai as genai
+        api_key = os.getenv("GOOGLE_API_KEY")
+        if not api_key:
+            sys.exit("Missing GOOGLE_API_KEY (set it in the environment or .env)")
+        genai.configure(api_key=api_key)
+    
+    # Fake responses must never land in the cache the app serves real answers from
+    cache = ResponseCache(path=args.cache) if args.cache and not args.dry_run else None
+    return LLMClient(
+        genai, cache=cache, model=args.model,
+        rate_limiter=TokenBucket(args.rpm / 60, capacity=args.concurrency) if args.rpm > 0 else None,
+        concurrency=AdaptiveConcurrency(initial=args.concurrency, maximum=args.concurrency),
+        breaker=CircuitBreaker(),
+        max_retries=args.max_retries
+    )
+
+def load_into_memory(memory, records):
+    """Store finished records in SharedMemory the same way the UI does"""
+    for record in records:
+        memory.add_analyzed_player({
+            "id": str(record["id"]),
+            "name": record.get("name", "Unknown"),
+            "position": record.get("position", "Unknown"),
+            "age": record.get("age", "N/A"),
+            "analysis_summary": record["analysis"],
+        })
+
+def run(args):
+    load_dotenv()
+    repository = load_player_repository(args.data)
+    players = select_players(repository, args)
+    
+    done = read_done(args.output, dry_run=args.dry_run)
+    memory = SharedMemory(SQLiteBackend(args.memory_db)) if args.memory_db else SharedMemory()
+    if args.memory_db:
+        # Results from earlier runs go into the store too, unless it already has them
+        load_into_memory(memory, [
+            record for player_id, record in done.items()
+            if memory.get_analyzed_player(player_id) is None
+        ])
+    
+    tool = FootballAnalysisTool(
+        make_client(args), repository, memory,
+        batch_size=args.batch_size,
+        metrics=MetricsEngine(repository.players),
+        jobs=AnalysisJobQueue(max_workers=args.concurrency)
+    )
+    
+    remaining = [player for player in players if str(player.get("id", player.get("name"))) not in done]
+    print(f"{len(players)} players selected, {len(players) - len(remaining)} already done, "
+          f"{len(remaining)} to analyze", file=sys.stderr)
+    if not remaining:
+        return 0
+    
+    job = tool.submit_job(remaining, owner="batch")
+    players_by_key = dict(zip(job.keys, job.players))
+    written = set()
+    errors = 0
+    started = time.perf_counter()
+    
+    with open(args.output, "a", encoding="utf-8") as out:
+        cursor = 0
+        finished = False
+        try:
+            while not finished:
+                cursor, changed, finished = job.wait(cursor, timeout=1.0)
+                for key in changed:
+                    status, text, error = job.player_state(key)
+                    if status not in (DONE, ERROR) or key in written:
+                        continue
+                    
+                    player = players_by_key[key]
+                    record = {
+                        "id": str(key),
+                        "name": player.get("name", "Unknown"),
+                        "position": player.get("position", "Unknown"),
+                        "age": player.get("age", "N/A"),
+                        "status": "ok" if status == DONE else "error",
+                        "model": args.model,
+                        "completed_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                    }
+                    if args.dry_run:
+                        record["dry_run"] = True
+                    if status == DONE:
+                        record["analysis"] = text
+                    else:
+                        record["error"] = error
+                        errors += 1
+                    
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    out.flush()
+                    written.add(key)
+                    
+                    if len(written) % args.progress_every == 0:
+                        print(f"{len(written)}/{len(remaining)} done", file=sys.stderr)
+        except KeyboardInterrupt:
+            tool.jobs.cancel(job.id)
+            print(f"Interrupted after {len(written)} players; rerun to resume", file=sys.stderr)
+            return 130
+        finally:
+            memory.flush()
+    
+    print(f"Analyzed {len(written) - errors} players ({errors} errors) in "
+          f"{time.perf_counter() - started:.1f}s -> {args.output}", file=sys.stderr)
+    return 1 if errors else 0
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze players without the UI, writing JSONL results")
+    parser.add_argument("--data", default=os.getenv("PLAYER_DATA_PATH", "data.json"))
+    parser.add_argument("--output", help="JSONL file to append results to (default analyses.jsonl)")
+    parser.add_argument("--ids", nargs="+", help="only these player ids")
+    parser.add_argument("--query", help="only players matching this search (name, club or county)")
+    parser.add_argument("--category", nargs="+", help="only these position categories (e.g. Defenders)")
+    parser.add_argument("--club", nargs="+", help="only these clubs")
+    parser.add_argument("--limit", type=int, help="analyze at most this many of the selected players")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("ANALYSIS_MAX_CONCURRENCY", "4")))
+    parser.add_argument("--batch-size", type=int, default=int(os.getenv("ANALYSIS_BATCH_SIZE", "1")))
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--rpm", type=float, default=float(os.getenv("LLM_RATE_LIMIT_RPM", "1000")),
+                        help="request rate limit per minute (0 disables)")
+    parser.add_argument("--max-retries", type=int, default=int(os.getenv("LLM_MAX_RETRIES", "3")))
+    parser.add_argument("--cache", default=os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite3"),
+                        help="LLM response cache shared with the app ('' to disable)")
+    parser.add_argument("--memory-db", help="also load results into this SharedMemory SQLite store")
+    parser.add_argument("--progress-every", type=int, default=25)
+    parser.add_argument("--dry-run", action="store_true", help="use the offline fake client (no API calls)")
+    args = parser.parse_args(argv)
+    
+    if args.dry_run:
+        # Keep fake output away from the files real runs and the app read
+        if args.output is None:
+            parser.error("--dry-run needs an explicit --output")
+        if args.memory_db:
+            parser.error("--dry-run can't load fake analyses into --memory-db")
+        args.model = f"dry-run/{args.model}"
+    elif args.output is None:
+        args.output = "analyses.jsonl"
+    args.batch_size = max(1, args.batch_size)
+    args.progress_every = max(1, args.progress_every)
+    return args
+
+def main(argv=None):
+    sys.exit(run(parse_args(argv)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import hashlib
+import random
+import threading
+import time
+
+class FakeGenAIError(Exception):
+    """Simulated upstream failure raised by FakeGenAI (a retryable 503)"""
+    code = 503
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+class _FakeModel:
+    """Mimics google.generativeai.GenerativeModel (the pinned 0.3.x SDK)"""
+    def __init__(self, owner, model_name):
+        self._owner = owner
+        self.model_name = model_name
+    
+    def generate_content(self, contents, *, generation_config=None, safety_settings=None, stream=False):
+        return self._owner._complete(contents, stream=stream)
+
+class FakeGenAI:
+    """
+    Deterministic local stand-in for the Gemini client. Latency, output size
+    and error rate are configurable; the output for a prompt is always the
+    same so cache behaviour can be benchmarked too.
+    """
+    WORDS = ["speed", "power", "control", "passing", "vision", "stamina", "pressing",
+             "positioning", "finishing", "potential", "development", "consistency"]
+    
+    def __init__(self, latency=0.5, first_token_latency=0.2, output_chars=1200,
+                 chunk_chars=80, error_rate=0.0, seed=0):
+        self.latency = latency
+        self.first_token_latency = first_token_latency
+        self.output_chars = output_chars
+        self.chunk_chars = chunk_chars
+        self.error_rate = error_rate
+        self.seed = seed
+        
+        self._lock = threading.Lock()
+        
+        # Failures are drawn per call (not per prompt) so retried requests can succeed
+        self._error_rng = random.Random(seed)
+        self.calls = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+    
+    def GenerativeModel(self, model_name="gemini-pro", generation_config=None, safety_settings=None):
+        return _FakeModel(self, model_name)
+    
+    def _prompt_seed(self, contents):
+        prompt = contents if isinstance(contents, str) else repr(contents)
+        digest = hashlib.sha256(f"{self.seed}:{prompt}".encode("utf-8")).digest()
+        return int.from_bytes(digest[:8], "big")
+    
+    def _text(self, rng):
+        words = []
+        length = 0
+        while length < self.output_chars:
+            word = rng.choice(self.WORDS)
+            words.append(word)
+            length += len(word) + 1
+        return " ".join(words)[:self.output_chars]
+    
+    def _complete(self, contents, stream):
+        rng = random.Random(self._prompt_seed(contents))
+        with self._lock:
+            self.calls += 1
+            fail = self._error_rng.random() < self.error_rate
+            if fail:
+                self.errors += 1
+        
+        text = self._text(rng)
+        if stream:
+            return self._stream(text, fail)
+        
+        self._track(1)
+        try:
+            time.sleep(self.latency)
+            if fail:
+                raise FakeGenAIError("simulated upstream error")
+            return FakeResponse(text)
+        finally:
+            self._track(-1)
+    
+    def _stream(self, text, fail):
+        chunks = [text[i:i + self.chunk_chars] for i in range(0, len(text), self.chunk_chars)] or [""]
+        per_chunk = max(0.0, self.latency - self.first_token_latency) / len(chunks)
+        
+        self._track(1)
+        try:
+            time.sleep(self.first_token_latency)
+            if fail:
+                raise FakeGenAIError("simulated upstream error")
+            for i, chunk in enumerate(chunks):
+                if i:
+                    time.sleep(per_chunk)
+                yield FakeResponse(chunk)
+        finally:
+            self._track(-1)
+    
+    def _track(self, delta):
+        with self._lock:
+            self.in_flight += delta
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
@@ -0,0 +1,67 @@
+"""
+Synthetic data.json generator for benchmarks.
+
+    python -m benchmarks.generate_data 10000 --output /tmp/players_10000.json
+"""
+import argparse
+import json
+import random
+
+FIRST_NAMES = ["Ahmed", "Mohamed", "Omar", "Youssef", "Karim", "Ali", "Hassan", "Jake", "Emily",
+               "Liam", "Noah", "Sara", "Mona", "Radwa", "أحمد", "محمد", "عمر", "يوسف", "خالد"]
+LAST_NAMES = ["Elganainy", "Anderson", "Clarke", "Hassan", "Salah", "Mansour", "Nabil", "Smith",
+              "Taylor", "عبدالرحمن", "الشهري", "القحطاني", "العتيبي"]
+POSITIONS = ["حارس", "Goalkeeper", "قلب الدفاع", "الظهير الأيسر", "الظهير الأيمن", "Center Back",
+             "Right Back", "Left Back", "وسط مركزي", "Central Midfielder", "Defensive Midfielder",
+             "Attacking Midfielder", "Left Winger", "Right Winger", "Striker"]
+CLUBS = ["السعودي", "الهلال", "النصر", "الاتحاد", "Al Ahly", "Zamalek", "Pyramids", "City FC"]
+COUNTIES = ["المدينة المنورة", "الرياض", "جدة", "Egypt", "Cairo", "England", "Alexandria"]
+METRICS = {
+    "turn": (1, 5), "speed": (3, 10), "power": (3, 10), "pushupsCount": (5, 40),
+    "dribbleSpeed": (4, 10), "backpedalSpeed": (3, 8), "takeOn": (1, 6),
+    "conesStrongFootTime7": (2, 5), "conesBothFeetTime7": (2, 5), "pushupSpeed": (0.3, 2),
+    "kneePushupSpeed": (0.3, 2), "jumpSpeed": (0.5, 3), "jugglingControl": (10, 100),
+}
+
+def generate_player(player_id, rng):
+    age = rng.randint(10, 36)
+    return {
+        "id": str(player_id),
+        "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {player_id}",
+        "age": age,
+        "gender": "ذكر",
+        "dateOfBirth": f"{rng.randint(1, 28)}/{rng.randint(1, 12)}/{2025 - age}",
+        "height": rng.randint(150, 200),
+        "weight": rng.randint(45, 95),
+        "county": rng.choice(COUNTIES),
+        "clubName": rng.choice(CLUBS),
+        "clubDate": f"{rng.randint(1, 28)}/{rng.randint(1, 12)}/{rng.randint(2018, 2025)}",
+        "position": rng.choice(POSITIONS),
+        "foot": rng.choice(["يمين", "يسار"]),
+        "tps": round(rng.uniform(3, 10), 2),
+        "performanceData": {
+            metric: round(rng.uniform(low, high), 2) for metric, (low, high) in METRICS.items()
+        },
+    }
+
+def generate_data(count, seed=0):
+    """Return a data.json-shaped dict with count synthetic players"""
+    rng = random.Random(seed)
+    return {"message": "Success", "data": [generate_player(i + 1, rng) for i in range(count)]}
+
+def write_data(path, count, seed=0):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(generate_data(count, seed), f, ensure_ascii=False)
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic data.json")
+    parser.add_argument("count", type=int, help="number of players (e.g. 100 to 100000)")
+    parser.add_argument("--output", default="data.synthetic.json")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    write_data(args.output, args.count, args.seed)
+    print(args.output)
+
+if __name__ == "__main__":
+    main()
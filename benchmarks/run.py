@@ -0,0 +1,259 @@
+"""
+Offline benchmark suite. Every LLM call goes to the local FakeGenAI client,
+so runs are deterministic and need no API key.
+
+    python -m benchmarks.run --sizes 100 1000 10000 --output bench.json
+
+Each roster size runs in its own subprocess so peak RSS is per size. Results
+are written as JSON for comparing runs.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _timed(fn, repeat=1):
+    """Run fn repeat times and return (mean seconds, last result)"""
+    result = None
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+def _selector_app():
+    import os
+    from components.analysis_tool import FootballAnalysisTool
+    from utils.memory_manager import SharedMemory
+    from utils.player_repository import load_player_repository
+    
+    repository = load_player_repository(os.environ["BENCH_DATA_PATH"])
+    FootballAnalysisTool(None, repository, SharedMemory()).render_selector_only()
+
+def _analysis_app():
+    import os
+    import streamlit as st
+    from benchmarks.fake_genai import FakeGenAI
+    from components.analysis_tool import FootballAnalysisTool
+    from utils.llm_client import LLMClient
+    from utils.memory_manager import SharedMemory
+    from utils.player_repository import load_player_repository
+    from utils.transcript import Transcript
+    
+    repository = load_player_repository(os.environ["BENCH_DATA_PATH"])
+    fake = FakeGenAI(
+        latency=float(os.environ["BENCH_LATENCY"]),
+        first_token_latency=float(os.environ["BENCH_FIRST_TOKEN_LATENCY"]),
+        output_chars=int(os.environ["BENCH_OUTPUT_CHARS"]),
+        error_rate=float(os.environ["BENCH_ERROR_RATE"])
+    )
+    count = int(os.environ["BENCH_ANALYSIS_PLAYERS"])
+    
+    st.session_state.selected_players = list(repository.players[:count])
+    st.session_state.analysis_results = []
+    st.session_state.transcript = Transcript()
+    
+    tool = FootballAnalysisTool(
+        LLMClient(fake), repository, SharedMemory(),
+        max_concurrency=int(os.environ["BENCH_CONCURRENCY"]),
+        batch_size=int(os.environ["BENCH_BATCH_SIZE"])
+    )
+    tool.perform_streaming_analysis()
+    st.session_state.fake_calls = fake.calls
+    st.session_state.fake_peak_in_flight = fake.peak_in_flight
+
+def bench_main_rerun(args):
+    """Cold first run and warm rerun cost of app.main"""
+    from streamlit.testing.v1 import AppTest
+    
+    at = AppTest.from_file(os.path.join(REPO_ROOT, "app.py"), default_timeout=600)
+    cold, _ = _timed(at.run)
+    warm, _ = _timed(at.run, repeat=args.reruns)
+    return {"cold_seconds": cold, "rerun_seconds": warm, "exceptions": len(at.exception)}
+
+def bench_selector(args):
+    """Rerun cost of render_selector_only"""
+    from streamlit.testing.v1 import AppTest
+    
+    at = AppTest.from_function(_selector_app, default_timeout=600)
+    cold, _ = _timed(at.run)
+    warm, _ = _timed(at.run, repeat=args.reruns)
+    return {"cold_seconds": cold, "rerun_seconds": warm, "exceptions": len(at.exception)}
+
+def bench_analysis(args):
+    """End-to-end throughput of perform_streaming_analysis against the fake client"""
+    from streamlit.testing.v1 import AppTest
+    
+    at = AppTest.from_function(_analysis_app, default_timeout=600)
+    seconds, _ = _timed(at.run)
+    players = int(os.environ["BENCH_ANALYSIS_PLAYERS"])
+    return {
+        "players": players,
+        "seconds": seconds,
+        "players_per_second": players / seconds if seconds else None,
+        "upstream_calls": at.session_state.fake_calls if "fake_calls" in at.session_state else None,
+        "peak_in_flight": at.session_state.fake_peak_in_flight if "fake_peak_in_flight" in at.session_state else None,
+        "exceptions": len(at.exception)
+    }
+
+def bench_memory_insert(args, players):
+    """Per-insert cost of SharedMemory.add_analyzed_player for each backend"""
+    from utils.memory_backends import SQLiteBackend
+    from utils.memory_manager import SharedMemory
+    
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        backends = {
+            "memory": lambda: None,
+            "sqlite": lambda: SQLiteBackend(os.path.join(tmp, "memory.sqlite3"))
+        }
+        for name, make_backend in backends.items():
+            memory = SharedMemory(make_backend())
+            
+            def insert_all():
+                for player in players:
+                    memory.add_analyzed_player({
+                        "id": str(player["id"]),
+                        "name": player["name"],
+                        "position": player["position"],
+                        "age": player["age"],
+                        "analysis_summary": "x" * 200
+                    })
+                memory.flush()
+            
+            seconds, _ = _timed(insert_all)
+            results[name] = {"seconds": seconds, "per_insert_us": seconds / max(len(players), 1) * 1e6}
+    return results
+
+def bench_prompt_building(args, players):
+    """Prompt assembly time in FootballChatbot.generate_response (no LLM call)"""
+    from components.chatbot import FootballChatbot
+    from utils.memory_manager import SharedMemory
+    
+    memory = SharedMemory()
+    for player in players:
+        memory.add_analyzed_player({
+            "id": str(player["id"]),
+            "name": player["name"],
+            "position": player["position"],
+            "age": player["age"],
+            "analysis_summary": f"{player['name']} shows strong speed and passing for a {player['position']}."
+        })
+    
+    setup, chatbot = _timed(lambda: FootballChatbot(None, None, memory))
+    query = f"How does {players[0]['name']} compare with other {players[0]['position']} players?"
+    seconds, prompt = _timed(lambda: chatbot._build_prompt(query), repeat=args.reruns)
+    return {"index_build_seconds": setup, "seconds": seconds, "prompt_chars": len(prompt)}
+
+def run_size(args, size):
+    """Run every benchmark for one roster size (called inside a worker process)"""
+    from benchmarks.generate_data import write_data
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        data_path = write_data(os.path.join(tmp, "data.json"), size, seed=args.seed)
+        os.environ.update({
+            "PLAYER_DATA_PATH": data_path,
+            "BENCH_DATA_PATH": data_path,
+            "LLM_CACHE_PATH": os.path.join(tmp, "llm_cache.sqlite3"),
+            "PERF_METRICS_PATH": os.path.join(tmp, "perf_metrics.prom"),
+            "BENCH_LATENCY": str(args.latency),
+            "BENCH_FIRST_TOKEN_LATENCY": str(args.first_token_latency),
+            "BENCH_OUTPUT_CHARS": str(args.output_chars),
+            "BENCH_ERROR_RATE": str(args.error_rate),
+            "BENCH_ANALYSIS_PLAYERS": str(min(size, args.analysis_players)),
+            "BENCH_CONCURRENCY": str(args.concurrency),
+            "BENCH_BATCH_SIZE": str(args.batch_size),
+        })
+        
+        with open(data_path, encoding="utf-8") as f:
+            players = json.load(f)["data"]
+        
+        benchmarks = {
+            "main_rerun": lambda: bench_main_rerun(args),
+            "render_selector_only": lambda: bench_selector(args),
+            "perform_streaming_analysis": lambda: bench_analysis(args),
+            "shared_memory_insert": lambda: bench_memory_insert(args, players),
+            "generate_response_prompt": lambda: bench_prompt_building(args, players),
+        }
+        
+        results = {}
+        for name, bench in benchmarks.items():
+            if args.only and name not in args.only:
+                continue
+            results[name] = bench()
+    
+    return {
+        "size": size,
+        "benchmarks": results,
+        # ru_maxrss is reported in KiB on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    }
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--output", help="write JSON results to this file")
+    parser.add_argument("--only", nargs="+", help="run only these benchmarks")
+    parser.add_argument("--reruns", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.5, help="fake LLM total latency (s)")
+    parser.add_argument("--first-token-latency", type=float, default=0.2)
+    parser.add_argument("--output-chars", type=int, default=1200)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--analysis-players", type=int, default=30)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+def _worker_argv(args, size):
+    """Command line for a worker process running a single roster size"""
+    argv = ["--worker", str(size)]
+    for option in ("reruns", "seed", "latency", "first_token_latency", "output_chars",
+                   "error_rate", "analysis_players", "concurrency", "batch_size"):
+        argv += [f"--{option.replace('_', '-')}", str(getattr(args, option))]
+    if args.only:
+        argv += ["--only"] + args.only
+    return argv
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    args = parse_args(argv)
+    
+    if args.worker is not None:
+        json.dump(run_size(args, args.worker), sys.stdout)
+        return
+    
+    runs = []
+    for size in args.sizes:
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.run"] + _worker_argv(args, size),
+            cwd=REPO_ROOT, check=True, capture_output=True, text=True
+        ).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+        print(f"size={size} done", file=sys.stderr)
+    
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "argv": argv
+        },
+        "runs": runs
+    }
+    
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text)
+
+if __name__ == "__main__":
+    main()
@@ -1,118 +1,69 @@
 import streamlit as st
-import pandas as pd
 import uuid
-import time
+import json
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from components.player_selector import PlayerSelector
+from utils.player_repository import position_category
+from utils.analysis_jobs import AnalysisJob, AnalysisJobQueue, DONE, ERROR, PENDING, RUNNING, TEAM
+from utils.instrumentation import perf
+from utils.transcript import Transcript
 
 class FootballAnalysisTool:
-    def __init__(self, client, data, memory):
+    def __init__(self, client, data, memory, max_concurrency=4, batch_size=1, metrics=None, jobs=None,
+                 poll_interval=0.5, team_chunk_size=12, team_merge_fanout=6):
         self.client = client
         self.data = data
         self.memory = memory
         
-        # Extract player data
-        self.players = data.get("data", [])
+        # Optional MetricsEngine providing cohort percentiles and z-scores
+        self.metrics = metrics
         
-        # Group players by position
-        self.positions = self._group_players_by_position()
-    
-    def _group_players_by_position(self):
-        """Group players by their positions"""
-        positions = {}
+        # Maximum number of in-flight LLM requests during analysis
+        self.max_concurrency = max_concurrency
         
-        for player in self.players:
-            position = player.get("position", "Unknown")
-            if position not in positions:
-                positions[position] = []
-            
-            positions[position].append(player)
+        # Players packed into one request (1 keeps per-player streaming)
+        self.batch_size = batch_size
         
-        return positions
+        # Background worker pool; share one AnalysisJobQueue across sessions so jobs survive reruns
+        self.jobs = jobs if jobs is not None else AnalysisJobQueue(max_workers=max_concurrency)
+        self.poll_interval = poll_interval
+        
+        # Squads larger than one chunk get a map-reduce team analysis over position groups
+        self.team_chunk_size = max(1, team_chunk_size)
+        self.team_merge_fanout = max(2, team_merge_fanout)
+    
+    @property
+    def players(self):
+        """Player list from the shared repository (kept current across data reloads)"""
+        return self.data.players
+    
+    @property
+    def positions(self):
+        """Players grouped by position, prebuilt by the shared repository"""
+        return self.data.by_position
     
     def render_selector_only(self):
         """Render only the player selection UI without analyze button"""
         st.write("Select players to analyze:")
-        
-        # Add "Select All" checkbox
-        select_all = st.checkbox("Select All")
-        
-        # Create position groups
-        all_selected_players = []
-        
-        # Handle goalkeepers
-        gk_selected = st.checkbox("GKs")
-        
-        if gk_selected or select_all:
-            st.markdown("### Goalkeepers")
-            gk_players = []
-            if "حارس" in self.positions:
-                gk_players.extend(self.positions.get("حارس", []))
-            if "Goalkeeper" in self.positions:
-                gk_players.extend(self.positions.get("Goalkeeper", []))
-                
-            for player in gk_players:
-                player_selected = st.checkbox(
-                    f"{player['name']} ({player.get('age', 'N/A')})",
-                    value=select_all or gk_selected,
-                    key=f"gk_{player.get('id', player['name'])}"
-                )
-                
-                if player_selected:
-                    all_selected_players.append(player)
-        
-        # Identify defense positions - define outside of conditional
-        defense_positions = [pos for pos in self.positions.keys() if 
-                           any(term in str(pos).lower() for term in 
-                              ["دفاع", "ظهير", "defence", "defender", "back"])]
-        
-        # Handle defenders
-        def_selected = st.checkbox("Defence")
-        
-        if def_selected or select_all:
-            st.markdown("### Defenders")
-            
-            for pos in defense_positions:
-                st.markdown(f"**{pos}:**")
-                
-                for player in self.positions.get(pos, []):
-                    player_selected = st.checkbox(
-                        f"{player['name']} ({player.get('age', 'N/A')})",
-                        value=select_all or def_selected,
-                        key=f"def_{player.get('id', player['name'])}"
-                    )
-                    
-                    if player_selected:
-                        all_selected_players.append(player)
-        
-        # Handle all other positions
-        other_positions = [pos for pos in self.positions.keys() if 
-                          pos not in ["حارس", "Goalkeeper"] and 
-                          pos not in defense_positions]
-        
-        for position in other_positions:
-            pos_selected = st.checkbox(position)
-            
-            if pos_selected or select_all:
-                st.markdown(f"### {position} Players")
-                
-                for player in self.positions.get(position, []):
-                    player_selected = st.checkbox(
-                        f"{player['name']} ({player.get('age', 'N/A')})",
-                        value=select_all or pos_selected,
-                        key=f"{position}_{player.get('id', player['name'])}"
-                    )
-                    
-                    if player_selected:
-                        all_selected_players.append(player)
-        
-        # Store selected players in session state for the button in main chat area
-        st.session_state.selected_players = all_selected_players
+        PlayerSelector(self.data).render()
     
     def perform_streaming_analysis(self):
-        """Perform analysis with streaming output in the main content area"""
+        """Show live progress of this session's analysis job, submitting it first if needed"""
         if not st.session_state.selected_players:
             return
         
-        selected_players = st.session_state.selected_players
+        # Initialize analysis results if needed
+        if "analysis_results" not in st.session_state:
+            st.session_state.analysis_results = []
+        if "transcript" not in st.session_state:
+            st.session_state.transcript = Transcript()
+        
+        # Reattach to a running job after a rerun or tab switch, else submit a new one
+        job = self._current_job()
+        if job is None:
+            job = self._submit_job(st.session_state.selected_players)
         
         # Create a placeholder for streaming output
         analysis_container = st.empty()
@@ -121,121 +72,303 @@ class FootballAnalysisTool:
         # Create a container for displaying results as they come in
         results_container = st.container()
         
-        # Initialize analysis results if needed
-        if "analysis_results" not in st.session_state:
-            st.session_state.analysis_results = []
-        
-        # Count of players already analyzed
-        analyzed_count = len(st.session_state.analysis_results)
-        
-        # If we already have some results but not all, continue from where we left off
-        remaining_players = selected_players[analyzed_count:]
-        
-        if remaining_players:
-            analysis_container.info(f"Analyzing {len(remaining_players)} remaining players...")
+        # One slot per player not yet in the chat keeps the original player order
+        recorded_ids = {result.get("id") for result in st.session_state.analysis_results}
+        slots = {key: results_container.empty() for key in job.keys if key not in recorded_ids}
+        team_slot = results_container.empty() if job.team_status is not None else None
+        players = dict(zip(job.keys, job.players))
+        placeholders = {}
+        team_placeholder = None
+        
+        # Poll the job; wait() returns as soon as a worker reports progress
+        cursor = 0
+        finished = False
+        while not finished:
+            cursor, changed, finished = job.wait(cursor, timeout=self.poll_interval)
             
-            for i, player in enumerate(remaining_players):
-                # Update progress
-                current_progress = (analyzed_count + i) / len(selected_players)
-                progress_bar.progress(current_progress)
-                
-                # Show thinking animation
-                analysis_container.info(f"Analyzing player {analyzed_count + i + 1} of {len(selected_players)}: {player['name']} ({player['position']})")
-                
-                # Simulate analysis thinking with dots
-                for dots in [".  ", ".. ", "..."]:
-                    analysis_container.info(f"Analyzing player {analyzed_count + i + 1} of {len(selected_players)}: {player['name']} ({player['position']}) {dots}")
-                    time.sleep(0.3)
-                
-                # Generate analysis
-                analysis = self._analyze_player(player)
+            for key in changed:
+                if key == TEAM:
+                    if team_slot is None or not job.team_analysis:
+                        continue
+                    if team_placeholder is None:
+                        team_placeholder = self._open_team_slot(team_slot, job)
+                    cursor_mark = "" if job.team_status == DONE else "▌"
+                    team_placeholder.markdown(job.team_analysis + cursor_mark)
+                    continue
                 
-                if analysis:
-                    # Update shared memory
-                    self._update_memory(player, analysis)
-                    
-                    # Add to results
-                    result = {
-                        "name": player.get("name", "Unknown"),
-                        "position": player.get("position", "Unknown"),
-                        "analysis": analysis
-                    }
-                    
-                    st.session_state.analysis_results.append(result)
-                    
-                    # Show current analysis
-                    analysis_container.success(f"Analysis complete for {player['name']}")
-                    
-                    # Add analysis to chat history instead of displaying separately
-                    user_message = f"Analyze player: {player['name']} ({player['position']})"
-                    
-                    if "messages" not in st.session_state:
-                        st.session_state.messages = []
-                    
-                    # Add "user request" and "assistant response" to chat history
-                    st.session_state.messages.append({"role": "user", "content": user_message})
-                    st.session_state.messages.append({"role": "assistant", "content": analysis})
-                    
-                    # Display in results container as well
-                    with results_container:
-                        with st.chat_message("user"):
-                            st.markdown(user_message)
-                        with st.chat_message("assistant"):
-                            st.markdown(analysis)
+                if key not in slots:
+                    continue
                 
-                # Small delay between players
-                time.sleep(0.5)
+                status, text, error = job.player_state(key)
+                if status == ERROR:
+                    slots[key].error(f"Error analyzing player {players[key]['name']}: {error}")
+                elif text:
+                    # Open the chat bubbles on the first token, then render partial text
+                    if key not in placeholders:
+                        placeholders[key] = self._open_player_slot(slots[key], players[key])
+                    placeholders[key].markdown(text if status == DONE else text + "▌")
             
-            # Analysis complete for all players
-            progress_bar.progress(1.0)
-            analysis_container.success(f"Analysis complete for all {len(selected_players)} players!")
-            
-            # Generate team analysis if multiple players
-            if len(selected_players) > 1:
+            # Update progress with real completions
+            completed, total = job.progress()
+            progress_bar.progress(completed / total if total else 1.0)
+            if completed < total:
+                analysis_container.info(f"Analyzed {completed} of {total} players...")
+            elif job.team_status in (PENDING, RUNNING):
                 analysis_container.info("Generating team analysis...")
-                
-                for dots in [".  ", ".. ", "..."]:
-                    analysis_container.info(f"Generating team analysis {dots}")
-                    time.sleep(0.3)
-                
-                team_analysis = self._generate_team_analysis(selected_players)
-                
-                if team_analysis:
-                    st.session_state.team_analysis = team_analysis
-                    analysis_container.success("Team analysis complete!")
-                    
-                    # Add team analysis to chat history
-                    team_request = f"Analyze team composition for selected {len(selected_players)} players"
-                    
-                    st.session_state.messages.append({"role": "user", "content": team_request})
-                    st.session_state.messages.append({"role": "assistant", "content": team_analysis})
-                    
-                    # Display in results container
-                    with results_container:
-                        with st.chat_message("user"):
-                            st.markdown(team_request)
-                        with st.chat_message("assistant"):
-                            st.markdown(team_analysis)
             
-            # Clear selected players to indicate we're done
-            st.session_state.selected_players = []
-            st.session_state.analysis_mode = False
-            
-            # Add a button to return to chat
-            if st.button("Return to Chat"):
+            # Record every finished result whose predecessors are finished too
+            self._sync_job_results(job)
+        
+        # Analysis complete for all players
+        progress_bar.progress(1.0)
+        failed = len(job.errors)
+        if job.team_status == DONE:
+            analysis_container.success("Team analysis complete!")
+        elif job.team_status == ERROR:
+            analysis_container.error(f"Team analysis failed: {job.team_error}")
+        elif not failed:
+            analysis_container.success(f"Analysis complete for all {len(job.players)} players!")
+        else:
+            analysis_container.empty()
+        
+        if failed:
+            st.warning(f"{failed} of {len(job.players)} players couldn't be analyzed; the errors are listed in the chat.")
+        
+        # Clear the job and selection to indicate we're done
+        self._finish_job()
+        
+        # Add a button to return to chat
+        if st.button("Return to Chat"):
+            st.rerun()
+    
+    def render_job_status(self):
+        """Sync background job results into the chat and show a progress notice"""
+        job = self._current_job()
+        if job is None:
+            return
+        
+        self._sync_job_results(job)
+        if job.finished:
+            self._finish_job()
+            return
+        
+        completed, total = job.progress()
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            st.info(f"Background analysis running: {completed} of {total} players analyzed")
+        with col2:
+            if st.button("View progress", use_container_width=True):
+                st.session_state.analysis_mode = True
                 st.rerun()
     
-    def _analyze_player(self, player):
-        """Analyze an individual player using LLM"""
-        # Construct analysis prompt
-        analysis_prompt = f"""
+    def cancel_job(self):
+        """Cancel this session's queued analysis, if any"""
+        job_id = st.session_state.get("analysis_job_id")
+        if job_id is not None:
+            self.jobs.cancel(job_id)
+        st.session_state.analysis_job_id = None
+    
+    def _session_owner(self):
+        """Queue owner id for fair scheduling across browser sessions"""
+        if "analysis_owner" not in st.session_state:
+            st.session_state.analysis_owner = uuid.uuid4().hex
+        return st.session_state.analysis_owner
+    
+    def _current_job(self):
+        job_id = st.session_state.get("analysis_job_id")
+        return self.jobs.get(job_id) if job_id is not None else None
+    
+    def submit_job(self, players, owner, done_keys=(), team=False):
+        """
+        Queue an analysis job for players, skipping those whose key is in
+        done_keys. Needs no Streamlit session, so headless runs can use it too.
+        """
+        keys = [self._player_key(player) for player in players]
+        job = AnalysisJob(owner, players, keys, done_keys=done_keys, team=team)
+        
+        remaining = [player for key, player in zip(keys, players) if job.status[key] != DONE]
+        batch_size = max(1, self.batch_size)
+        tasks = [
+            functools.partial(self._run_player_task, job, remaining[start:start + batch_size])
+            for start in range(0, len(remaining), batch_size)
+        ]
+        final_task = functools.partial(self._run_team_task, job) if team else None
+        
+        return self.jobs.submit(job, tasks, final_task)
+    
+    def _submit_job(self, players):
+        """Queue an analysis job for the players not yet analyzed in this session"""
+        analyzed_ids = {result.get("id") for result in st.session_state.analysis_results}
+        job = self.submit_job(players, self._session_owner(), done_keys=analyzed_ids, team=len(players) > 1)
+        
+        st.session_state.analysis_job_id = job.id
+        st.session_state.analysis_job_synced = 0
+        st.session_state.analysis_job_team_synced = False
+        return job
+    
+    def _sync_job_results(self, job):
+        """Copy finished results into session state, in player order"""
+        index = st.session_state.get("analysis_job_synced", 0)
+        recorded_ids = {result.get("id") for result in st.session_state.analysis_results}
+        
+        while index < len(job.keys):
+            key = job.keys[index]
+            status, text, error = job.player_state(key)
+            if status not in (DONE, ERROR):
+                break
+            if status == DONE and text and key not in recorded_ids:
+                self._record_player_analysis(job.players[index], text, job)
+            elif status == ERROR:
+                self._record_player_error(job.players[index], error)
+            index += 1
+        st.session_state.analysis_job_synced = index
+        
+        if (index == len(job.keys) and job.team_status == DONE
+                and not st.session_state.get("analysis_job_team_synced")):
+            team_request = f"Analyze team composition for selected {len(job.players)} players"
+            
+            # Add team analysis to chat history; session state keeps only its transcript reference
+            ref = f"team:{job.id}"
+            st.session_state.transcript.add_analysis(ref, team_request, job.team_analysis)
+            st.session_state.team_analysis = ref
+            st.session_state.analysis_job_team_synced = True
+    
+    def _finish_job(self):
+        st.session_state.analysis_job_id = None
+        st.session_state.selected_players = []
+        st.session_state.analysis_mode = False
+    
+    def _run_player_task(self, job, players):
+        """Worker task: analyze players (batched when several) and checkpoint each result"""
+        if job.cancelled:
+            return
+        
+        analyses = {}
+        if len(players) > 1:
+            for player in players:
+                job.start(self._player_key(player))
+            try:
+                with perf.timer("analyze_batch_seconds"):
+                    analyses = self._request_batch_analysis(players)
+            except Exception:
+                analyses = {}
+        
+        for player in players:
+            key = self._player_key(player)
+            analysis = analyses.get(str(key))
+            if analysis:
+                self._checkpoint(job, player, analysis)
+            else:
+                # Players missing from a failed or malformed response are retried on their own
+                self._stream_player_task(job, player)
+    
+    def _stream_player_task(self, job, player):
+        """Stream one player's analysis into the job"""
+        key = self._player_key(player)
+        job.start(key)
+        try:
+            with perf.timer("analyze_player_seconds"):
+                parts = []
+                for chunk in self._stream_player_analysis(player):
+                    parts.append(chunk)
+                    job.append(key, chunk)
+            self._checkpoint(job, player, "".join(parts))
+        except Exception as e:
+            perf.inc("analyze_player_errors_total")
+            job.fail(key, e)
+    
+    def _checkpoint(self, job, player, analysis):
+        """Persist a finished analysis to shared memory, then mark it done in the job"""
+        self._update_memory(player, analysis)
+        job.finish(self._player_key(player), analysis)
+    
+    def _run_team_task(self, job):
+        """Worker task: stream the team analysis into the job"""
+        try:
+            with perf.timer("team_analysis_seconds"):
+                team_analysis = ""
+                for chunk in self._stream_team_analysis(job.players):
+                    team_analysis += chunk
+                    job.team_append(chunk)
+            job.team_finish(team_analysis)
+        except Exception as e:
+            job.team_finish(error=e)
+    
+    def _open_player_slot(self, slot, player):
+        """Render the request bubble for a player and return the response placeholder"""
+        with slot.container():
+            with st.chat_message("user"):
+                st.markdown(self._player_request_message(player))
+            with st.chat_message("assistant"):
+                self._render_cohort_stats(player)
+                return st.empty()
+    
+    def _render_cohort_stats(self, player):
+        """Show the player's position and age-group percentiles"""
+        profile = self.metrics.player_profile(self._player_key(player)) if self.metrics else None
+        if not profile:
+            return
+        
+        # pandas is only needed once a result is on screen
+        import pandas as pd
+        
+        with st.expander("Cohort percentiles"):
+            st.dataframe(
+                pd.DataFrame.from_dict(profile, orient="index").round(2),
+                use_container_width=True
+            )
+    
+    def _open_team_slot(self, slot, job):
+        """Render the team request bubble and return the response placeholder"""
+        with slot.container():
+            with st.chat_message("user"):
+                st.markdown(f"Analyze team composition for selected {len(job.players)} players")
+            with st.chat_message("assistant"):
+                return st.empty()
+    
+    def _player_request_message(self, player):
+        """Chat message shown as the request for a player analysis"""
+        return f"Analyze player: {player['name']} ({player['position']})"
+    
+    def _record_player_analysis(self, player, analysis, job):
+        """Store a finished player analysis in session state (memory is updated by the worker)"""
+        # Results only list who was analyzed; the text is kept once, in the transcript, under a
+        # reference unique to this job so re-analyzing a player never rewrites earlier turns
+        result = {
+            "id": self._player_key(player),
+            "name": player.get("name", "Unknown"),
+            "position": player.get("position", "Unknown"),
+            "ref": f"{self._player_key(player)}:{job.id}"
+        }
+        
+        st.session_state.analysis_results.append(result)
+        
+        # Add "user request" and a reference to the response to chat history
+        st.session_state.transcript.add_analysis(
+            result["ref"], self._player_request_message(player), analysis
+        )
+    
+    def _record_player_error(self, player, error):
+        """Note a failed player analysis in chat history so it isn't silently missing"""
+        st.session_state.transcript.add("user", self._player_request_message(player))
+        st.session_state.transcript.add(
+            "assistant", f"Couldn't analyze {player.get('name', 'Unknown')}: {error}"
+        )
+    
+    def _player_key(self, player):
+        """Stable key used to track a player across reruns"""
+        return player.get("id", player["name"])
+    
+    def _build_player_prompt(self, player, cohort=True):
+        """Construct the analysis prompt for a single player (cohort=False omits the cohort comparison)"""
+        return f"""
         Analyze this football player's data considering age and performance metrics:
         
         Player: {player['name']}
         Age: {player['age']}
         Position: {player['position']}
         Performance Data: {player['performanceData']}
-        
+        {self._cohort_context(player) if cohort else ""}
         Consider:
         1. Age-appropriate performance expectations
         2. Position-specific requirements
@@ -248,30 +381,126 @@ class FootballAnalysisTool:
         - Development Areas (2-3 points)
         - Age-Specific Recommendations
         """
+    
+    def _cohort_context(self, player):
+        """Cohort percentiles and z-scores for the prompt, if the metrics engine is available"""
+        if self.metrics is None:
+            return ""
+        
+        stats = self.metrics.format_for_prompt(self._player_key(player))
+        if not stats:
+            return ""
+        
+        return (
+            "\n        Cohort Comparison (percentile and z-score within position and age group):\n"
+            + "\n".join(f"        {line}" for line in stats.splitlines())
+            + "\n"
+        )
+    
+    def _build_batch_prompt(self, players, cohort=True):
+        """Construct one analysis prompt covering several players (cohort=False omits the cohort comparisons)"""
+        player_lines = "\n".join(
+            f"        - id: {self._player_key(player)} | Player: {player['name']} | Age: {player['age']} | "
+            f"Position: {player['position']} | Performance Data: {player['performanceData']}"
+            + (self._cohort_context(player).rstrip() if cohort else "")
+            for player in players
+        )
+        
+        return f"""
+        Analyze each of these football players' data considering age and performance metrics:
+
+{player_lines}
+        
+        For each player consider:
+        1. Age-appropriate performance expectations
+        2. Position-specific requirements
+        3. Standout metrics and areas for improvement
+        4. Development potential based on age
+        
+        Write each player's analysis as markdown in this format:
+        - Overall Assessment
+        - Key Strengths (2-3 points)
+        - Development Areas (2-3 points)
+        - Age-Specific Recommendations
+        
+        Respond with only a JSON object mapping every player id to its analysis,
+        for example {{"<id>": "<analysis>"}}.
+        """
+    
+    def _request_batch_analysis(self, players):
+        """Analyze several players in one LLM request and split the JSON reply by player id"""
+        # The pinned SDK has no JSON response mode; the prompt asks for JSON and the parser is lenient
+        # As for single players, the drifting cohort numbers are left out of the cache key
+        response = self.client.generate(
+            self._build_batch_prompt(players),
+            cache_key=self._build_batch_prompt(players, cohort=False)
+        )
+        return self._parse_batch_response(response)
+    
+    def _parse_batch_response(self, response):
+        """Parse a {id: analysis} JSON reply, tolerating code fences; returns {} if malformed"""
+        text = (response or "").strip()
+        start, end = text.find("{"), text.rfind("}")
+        if start == -1 or end <= start:
+            return {}
         
         try:
-            completion = self.client.models.generate_content(
-                model="gemini-2.0-flash",
-                contents=[{"parts": [{"text": analysis_prompt}]}]
-            )
-            return completion.text
-        except Exception as e:
-            st.error(f"Error analyzing player {player['name']}: {str(e)}")
-            return None
+            parsed = json.loads(text[start:end + 1])
+        except ValueError:
+            return {}
+        
+        if not isinstance(parsed, dict):
+            return {}
+        
+        analyses = {}
+        for player_id, analysis in parsed.items():
+            if isinstance(analysis, (dict, list)):
+                analysis = json.dumps(analysis, ensure_ascii=False, indent=2)
+            if analysis:
+                analyses[str(player_id)] = str(analysis)
+        return analyses
+    
+    def _stream_player_analysis(self, player):
+        """Stream the LLM analysis of a single player; safe to run off the script thread"""
+        # Cohort percentiles shift whenever any cohort member changes, so the cached response is
+        # keyed on the player's own data and the prompt template only
+        return self.client.stream(
+            self._build_player_prompt(player),
+            tag=str(self._player_key(player)),
+            cache_key=self._build_player_prompt(player, cohort=False)
+        )
+    
+    def _stream_team_analysis(self, players):
+        """Stream the team analysis and store it as a team insight; safe to run off the script thread"""
+        # Large squads are summarized per position group first so the final prompt stays small
+        if len(players) > self.team_chunk_size:
+            prompt = self._build_hierarchical_team_prompt(players)
+        else:
+            prompt = self._build_team_prompt(players)
+        
+        team_analysis = ""
+        for chunk in self.client.stream(prompt):
+            team_analysis += chunk
+            yield chunk
+        
+        # Update memory with team insights
+        self.memory.add_team_insight(team_analysis)
     
-    def _generate_team_analysis(self, players):
-        """Generate comprehensive team analysis using LLM"""
-        # Count position distribution
+    def _position_distribution(self, players):
+        """Count players per position"""
         position_distribution = {}
         for player in players:
             pos = player.get("position", "Unknown")
             position_distribution[pos] = position_distribution.get(pos, 0) + 1
-        
-        team_analysis_prompt = f"""
+        return position_distribution
+    
+    def _build_team_prompt(self, players):
+        """Construct the team analysis prompt"""
+        return f"""
         Analyze this football team based on the following player data:
         
         Players Analyzed: {len(players)}
-        Position Distribution: {position_distribution}
+        Position Distribution: {self._position_distribution(players)}
         
         Individual Players:
         {self._format_players_for_prompt(players)}
@@ -285,21 +514,134 @@ class FootballAnalysisTool:
         
         Focus on practical, actionable insights.
         """
+    
+    def _build_hierarchical_team_prompt(self, players):
+        """
+        Map-reduce team prompt: summarize position groups in parallel, merge the
+        summaries until few enough remain, then ask for the team report.
+        """
+        groups = self._team_groups(players)
+        summaries = self._summarize_parallel([
+            self._build_group_prompt(label, members) for label, members in groups
+        ])
         
-        try:
-            completion = self.client.models.generate_content(
-                model="gemini-2.0-flash",
-                contents=[{"parts": [{"text": team_analysis_prompt}]}]
-            )
+        # Merge summaries in rounds so the final prompt size doesn't grow with the squad
+        while len(summaries) > self.team_merge_fanout:
+            summaries = self._summarize_parallel([
+                self._build_merge_prompt(summaries[start:start + self.team_merge_fanout])
+                for start in range(0, len(summaries), self.team_merge_fanout)
+            ])
+        
+        group_summaries = "\n\n".join(summaries)
+        return f"""
+        Analyze this football team based on the following position group summaries:
+        
+        Players Analyzed: {len(players)}
+        Position Distribution: {self._position_distribution(players)}
+        
+        Group Summaries:
+        {group_summaries}
+        
+        Provide:
+        1. Overall team composition assessment
+        2. Key strengths and gaps
+        3. Age distribution insights
+        4. Development recommendations
+        5. Position coverage analysis
+        
+        Focus on practical, actionable insights.
+        """
+    
+    def _team_groups(self, players):
+        """
+        [(label, players)] by position category. Large categories are split into
+        chunks of team_chunk_size and small ones are packed together. Ordering
+        is deterministic so an unchanged group produces the same prompt and its
+        summary is served from the response cache.
+        """
+        by_category = {}
+        for player in players:
+            by_category.setdefault(position_category(player.get("position", "Unknown")), []).append(player)
+        
+        groups = []
+        labels, members = [], []
+        for category in sorted(by_category, key=str):
+            category_players = sorted(by_category[category], key=lambda player: str(self._player_key(player)))
             
-            # Update memory with team insights
-            team_analysis = completion.text
-            self.memory.add_team_insight(team_analysis)
+            if len(category_players) > self.team_chunk_size:
+                chunks = range(0, len(category_players), self.team_chunk_size)
+                for number, start in enumerate(chunks, 1):
+                    groups.append((
+                        f"{category} ({number}/{len(chunks)})",
+                        category_players[start:start + self.team_chunk_size]
+                    ))
+                continue
             
-            return team_analysis
-        except Exception as e:
-            st.error(f"Error generating team analysis: {str(e)}")
-            return None
+            if len(members) + len(category_players) > self.team_chunk_size:
+                groups.append((", ".join(labels), members))
+                labels, members = [], []
+            labels.append(str(category))
+            members = members + category_players
+        
+        if members:
+            groups.append((", ".join(labels), members))
+        return groups
+    
+    def _build_group_prompt(self, label, players):
+        """Summary prompt for one position group, built from the stored per-player analyses"""
+        player_lines = "\n".join(
+            f"        - {player.get('name', 'Unknown')} ({player.get('age', 'N/A')}, "
+            f"{player.get('position', 'Unknown')}): {self._analysis_excerpt(player)}"
+            for player in players
+        )
+        
+        return f"""
+        Summarize the {label} group of a football squad for a team report.
+        
+        Players ({len(players)}):
+{player_lines}
+        
+        In under 150 words, cover:
+        - Collective strengths
+        - Gaps and risks
+        - Age profile and development priorities
+        
+        Start with the heading "{label}".
+        """
+    
+    def _build_merge_prompt(self, summaries):
+        """Prompt combining several group summaries into one"""
+        joined = "\n\n".join(summaries)
+        return f"""
+        Combine these football squad group summaries into one summary of under
+        200 words, keeping each group's key strengths, gaps and development priorities:
+        
+        {joined}
+        """
+    
+    def _analysis_excerpt(self, player, limit=400):
+        """Shortened stored analysis of a player, or its basic data if none is stored"""
+        stored = self.memory.get_analyzed_player(str(self._player_key(player)))
+        if not stored:
+            return f"Performance Data: {player.get('performanceData', {})}"
+        
+        text = " ".join(str(stored.get("analysis_summary", "")).split())
+        return text if len(text) <= limit else text[:limit].rstrip() + "..."
+    
+    def _summarize_parallel(self, prompts):
+        """
+        Run independent summary prompts concurrently, keeping their order. Any
+        failed or empty summary raises, failing the team analysis rather than
+        reporting on part of the squad.
+        """
+        def summarize(prompt):
+            summary = self.client.generate(prompt)
+            if not summary:
+                raise ValueError("A position group summary came back empty")
+            return summary
+        
+        with ThreadPoolExecutor(max_workers=max(1, self.max_concurrency)) as executor:
+            return list(executor.map(summarize, prompts))
     
     def _format_players_for_prompt(self, players):
         """Format players data for LLM prompt"""
@@ -311,7 +653,7 @@ class FootballAnalysisTool:
     def _update_memory(self, player, analysis):
         """Update shared memory with player analysis"""
         player_info = {
-            'id': player.get('id', str(uuid.uuid4())),
+            'id': str(player['id']) if 'id' in player else str(uuid.uuid4()),
             'name': player.get('name', 'Unknown'),
             'position': player.get('position', 'Unknown'),
             'age': player.get('age', 'N/A'),
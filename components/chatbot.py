@@ -1,17 +1,37 @@
 import streamlit as st
-import google.generativeai as genai
+
+from utils.context_builder import ContextBuilder, tokenize
+from utils.instrumentation import perf
 
 class FootballChatbot:
-    def __init__(self, data, memory):
+    def __init__(self, client, data, memory, context_builder=None, similarity=None):
+        self.client = client
         self.data = data
         self.memory = memory
+        self.similarity = similarity
+        
+        # Share a long-lived builder when possible so its index isn't rebuilt
+        self.context_builder = context_builder or ContextBuilder(memory)
     
     def generate_response(self, prompt):
         """Generate a response using the Gemini model with context from memory"""
-        # Create context from memory
-        analyzed_players = self.memory.get("analyzed_players", [])
-        team_insights = self.memory.get("team_insights", [])
-        
+        return "".join(self.stream_response(prompt))
+    
+    def stream_response(self, prompt):
+        """Yield the response text incrementally as the model streams it"""
+        with perf.timer("chat_response_seconds"):
+            with perf.timer("chat_prompt_build_seconds"):
+                full_prompt = self._build_prompt(prompt)
+            
+            try:
+                # Use the shared client so repeated prompts are served from cache
+                yield from self.client.stream(full_prompt)
+            except Exception as e:
+                perf.inc("chat_errors_total")
+                yield f"Sorry, I encountered an error: {str(e)}"
+    
+    def _build_prompt(self, prompt):
+        """Assemble the full prompt from memory, session context and chat history"""
         # Add current analysis results if available
         analysis_context = ""
         if hasattr(st.session_state, "analysis_results") and st.session_state.analysis_results:
@@ -22,17 +42,11 @@ class FootballChatbot:
         if hasattr(st.session_state, "team_analysis") and st.session_state.team_analysis:
             analysis_context += "\nRecent team analysis is also available.\n"
         
-        # Create context from memory
-        memory_context = ""
-        if analyzed_players:
-            memory_context += "Previously analyzed players:\n"
-            for player in analyzed_players:
-                memory_context += f"- {player['name']} ({player['position']})\n"
+        # Create context from the memory entries most relevant to the query
+        memory_context = self.context_builder.build(prompt)
         
-        if team_insights:
-            memory_context += "\nTeam insights:\n"
-            for insight in team_insights:
-                memory_context += f"- {insight}\n"
+        # Add the nearest profiles of any player named in the query ("who plays like X?")
+        similarity_context = self._similarity_context(prompt)
         
         # Create system prompt
         system_prompt = """
@@ -46,22 +60,41 @@ class FootballChatbot:
         
         # Add chat history context for continuity
         chat_history = ""
-        if "messages" in st.session_state and len(st.session_state.messages) > 0:
-            last_messages = st.session_state.messages[-4:] if len(st.session_state.messages) > 4 else st.session_state.messages
+        if "transcript" in st.session_state and len(st.session_state.transcript) > 0:
+            last_messages = st.session_state.transcript.recent(4)
             chat_history = "\nRecent conversation:\n"
             for msg in last_messages:
                 role = "User" if msg["role"] == "user" else "Assistant"
                 chat_history += f"{role}: {msg['content']}\n"
         
         # Combine context, system prompt, and user query
-        full_prompt = f"{system_prompt}\n\n{analysis_context}\n{memory_context}\n{chat_history}\n\nUser query: {prompt}"
+        full_prompt = f"{system_prompt}\n\n{analysis_context}\n{memory_context}\n{similarity_context}\n{chat_history}\n\nUser query: {prompt}"
+        
+        return full_prompt
+    
+    def _mentioned_players(self, prompt, limit=2):
+        """Players whose full name appears in the query, longest names first"""
+        tokens = set(tokenize(prompt))
+        found = {}
+        for token in tokens:
+            if len(token) < 3:
+                continue
+            for player in self.data.search(token):
+                name_tokens = set(tokenize(player.get("name", "")))
+                if name_tokens and name_tokens <= tokens:
+                    found[str(player.get("id", player.get("name")))] = (len(name_tokens), player)
+        
+        ranked = sorted(found.values(), key=lambda item: (-item[0], self.data.position_of(item[1])))
+        return [player for _, player in ranked[:limit]]
+    
+    def _similarity_context(self, prompt):
+        """Nearest-neighbour lists for players named in the query"""
+        if self.similarity is None:
+            return ""
         
-        try:
-            # Use genai to generate content
-            response = genai.generate_text(
-                model="gemini-2.0-flash",
-                prompt=full_prompt
-            )
-            return response.text
-        except Exception as e:
-            return f"Sorry, I encountered an error: {str(e)}"
+        context = ""
+        for player in self._mentioned_players(prompt):
+            similar = self.similarity.format_for_prompt(player, self.data)
+            if similar:
+                context += f"\nPlayers with the most similar profiles to {player.get('name', 'Unknown')}:\n{similar}\n"
+        return context
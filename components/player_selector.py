@@ -0,0 +1,167 @@
+import streamlit as st
+
+from utils.player_repository import AGE_BUCKETS
+
+PAGE_SIZES = [10, 25, 50, 100]
+
+class PlayerSelector:
+    """
+    Searchable, filterable and paginated player picker. Only the current
+    page is rendered as checkboxes and the selection is kept as a set of ids,
+    so rerender cost depends on page size rather than roster size.
+    """
+    def __init__(self, repository):
+        self.repository = repository
+    
+    def _init_state(self):
+        if "selected_ids" not in st.session_state:
+            st.session_state.selected_ids = set()
+        if "selector_version" not in st.session_state:
+            st.session_state.selector_version = 0
+        if "selector_page" not in st.session_state:
+            st.session_state.selector_page = 1
+        if "selection_revision" not in st.session_state:
+            st.session_state.selection_revision = 0
+    
+    def _player_id(self, player):
+        return str(player.get("id", player.get("name")))
+    
+    def _reset_page(self):
+        st.session_state.selector_page = 1
+    
+    def _change_page(self, step):
+        st.session_state.selector_page += step
+    
+    def _toggle(self, player_id, key):
+        """Checkbox callback keeping the id set in sync"""
+        if st.session_state[key]:
+            st.session_state.selected_ids.add(player_id)
+        else:
+            st.session_state.selected_ids.discard(player_id)
+        st.session_state.selection_revision += 1
+    
+    def _select_matching(self, query, categories, buckets):
+        """Select every player matching the current search and filters"""
+        players = self._filtered_players(query, categories, buckets)
+        st.session_state.selected_ids.update(self._player_id(player) for player in players)
+        st.session_state.selector_version += 1
+        st.session_state.selection_revision += 1
+    
+    def _clear(self):
+        """Deselect everyone and refresh the page's checkbox widgets"""
+        st.session_state.selected_ids = set()
+        st.session_state.selector_version += 1
+        st.session_state.selection_revision += 1
+    
+    def _filtered_players(self, query, categories, buckets):
+        """Players matching the search text and filters, memoized per session"""
+        cache_key = (self.repository.version, query, tuple(categories), tuple(buckets))
+        cached = st.session_state.get("selector_matches")
+        if cached is not None and cached[0] == cache_key:
+            return cached[1]
+        
+        players = self._match(query, categories, buckets)
+        st.session_state.selector_matches = (cache_key, players)
+        return players
+    
+    def _match(self, query, categories, buckets):
+        """Players matching the search text and filters, in repository order"""
+        players = self.repository.search(query) if query.strip() else self.repository.players
+        
+        if not categories and not buckets:
+            return players
+        
+        allowed = None
+        for index, keys in ((self.repository.by_category, categories), (self.repository.by_age_bucket, buckets)):
+            if not keys:
+                continue
+            ids = {self._player_id(player) for key in keys for player in index.get(key, ())}
+            allowed = ids if allowed is None else allowed & ids
+        
+        return [player for player in players if self._player_id(player) in allowed]
+    
+    def _selected_players(self, selected_ids):
+        """Selected players in repository order, memoized per session"""
+        # Every change to selected_ids bumps the revision
+        cache_key = (st.session_state.selection_revision, self.repository.version)
+        cached = st.session_state.get("selector_selected")
+        if cached is not None and cached[0] == cache_key:
+            return cached[1]
+        
+        selected = [self.repository.get(player_id) for player_id in selected_ids]
+        players = sorted(
+            (player for player in selected if player is not None),
+            key=self.repository.position_of
+        )
+        st.session_state.selector_selected = (cache_key, players)
+        return players
+    
+    def render(self):
+        """Render the selector and publish the selection to session state"""
+        self._init_state()
+        
+        query = st.text_input(
+            "Search players",
+            placeholder="Name, club or county",
+            on_change=self._reset_page
+        )
+        categories = st.multiselect(
+            "Positions",
+            list(self.repository.by_category.keys()),
+            on_change=self._reset_page
+        )
+        bucket_labels = [label for _, label in AGE_BUCKETS] + ["Senior", "Unknown"]
+        buckets = st.multiselect(
+            "Age groups",
+            [label for label in bucket_labels if label in self.repository.by_age_bucket],
+            on_change=self._reset_page
+        )
+        
+        players = self._filtered_players(query, categories, buckets)
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.button(
+                f"Select all {len(players)}",
+                use_container_width=True,
+                on_click=self._select_matching,
+                args=(query, categories, buckets)
+            )
+        with col2:
+            st.button("Clear", use_container_width=True, on_click=self._clear)
+        
+        # Paging
+        page_size = st.selectbox("Players per page", PAGE_SIZES, index=1, on_change=self._reset_page)
+        page_count = max(1, -(-len(players) // page_size))
+        page = min(st.session_state.selector_page, page_count)
+        st.session_state.selector_page = page
+        
+        if page_count > 1:
+            col1, col2, col3 = st.columns([1, 2, 1])
+            with col1:
+                st.button("‹", key="selector_prev", disabled=page <= 1,
+                          on_click=self._change_page, args=(-1,))
+            with col2:
+                st.caption(f"Page {page} of {page_count}")
+            with col3:
+                st.button("›", key="selector_next", disabled=page >= page_count,
+                          on_click=self._change_page, args=(1,))
+        
+        selected_ids = st.session_state.selected_ids
+        version = st.session_state.selector_version
+        for player in players[(page - 1) * page_size:page * page_size]:
+            player_id = self._player_id(player)
+            key = f"pick_{version}_{player_id}"
+            st.checkbox(
+                f"{player['name']} ({player.get('age', 'N/A')}) · {player.get('position', 'Unknown')}",
+                value=player_id in selected_ids,
+                key=key,
+                on_change=self._toggle,
+                args=(player_id, key)
+            )
+        
+        st.caption(f"{len(selected_ids)} selected · {len(players)} matching")
+        
+        # Selected players in repository order for the analysis flow
+        st.session_state.selected_players = self._selected_players(selected_ids)
+
@@ -0,0 +1,125 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+
+PAGE_SIZES = [25, 50, 100, 250]
+
+BASE_COLUMNS = ["Name", "Age", "Position", "Club", "TPS"]
+
+@st.cache_resource(max_entries=2)
+def build_player_frame(path, version, _repository):
+    """
+    Typed table of every player, built once per data version: categorical
+    position and club, nullable integer age and one float column per
+    performanceData metric. Indexed by player id.
+    """
+    players = _repository.players
+    metrics = pd.DataFrame.from_records(
+        [dict(player.get("performanceData") or {}) for player in players]
+    ).apply(pd.to_numeric, errors="coerce")
+    
+    frame = pd.DataFrame({
+        "Name": pd.array([player.get("name", "Unknown") for player in players], dtype="string[pyarrow]"),
+        "Age": pd.to_numeric(pd.Series([player.get("age") for player in players]), errors="coerce").astype("Int64"),
+        "Position": pd.Categorical([player.get("position", "Unknown") for player in players]),
+        "Club": pd.Categorical([player.get("clubName", "Unknown") for player in players]),
+        "TPS": pd.to_numeric(pd.Series([player.get("tps") for player in players]), errors="coerce"),
+    })
+    frame = pd.concat([frame, metrics[sorted(metrics.columns)]], axis=1)
+    frame.index = pd.Index([str(player.get("id", player.get("name"))) for player in players], name="id")
+    return frame
+
+class PlayerTable:
+    """
+    Database tab. The typed table is cached per data version; filtering and
+    sorting happen on the server and only the visible page is sent to the
+    browser.
+    """
+    def __init__(self, repository):
+        self.repository = repository
+    
+    def _reset_page(self):
+        st.session_state.table_page = 1
+    
+    def _change_page(self, step):
+        st.session_state.table_page += step
+    
+    def _view(self, frame, query, positions, clubs, sort_by, descending):
+        """Row positions matching the filters in sort order, memoized per session"""
+        cache_key = (self.repository.version, query, tuple(positions), tuple(clubs), sort_by, descending)
+        cached = st.session_state.get("table_view")
+        if cached is not None and cached[0] == cache_key:
+            return cached[1]
+        
+        mask = np.ones(len(frame), dtype=bool)
+        if query.strip():
+            ids = [str(player.get("id", player.get("name"))) for player in self.repository.search(query)]
+            mask &= frame.index.isin(ids)
+        if positions:
+            mask &= frame["Position"].isin(positions).to_numpy()
+        if clubs:
+            mask &= frame["Club"].isin(clubs).to_numpy()
+        rows = np.flatnonzero(mask)
+        
+        if sort_by:
+            values = frame[sort_by].iloc[rows].reset_index(drop=True)
+            order = values.sort_values(ascending=not descending, na_position="last", kind="stable").index
+            rows = rows[order.to_numpy()]
+        
+        st.session_state.table_view = (cache_key, rows)
+        return rows
+    
+    def render(self):
+        """Render filters, sort controls and the current page of the table"""
+        if "table_page" not in st.session_state:
+            st.session_state.table_page = 1
+        
+        frame = build_player_frame(self.repository.path, self.repository.version, self.repository)
+        metric_columns = [column for column in frame.columns if column not in BASE_COLUMNS]
+        
+        col1, col2, col3 = st.columns([2, 1, 1])
+        with col1:
+            query = st.text_input("Search", placeholder="Name, club or county",
+                                  key="table_query", on_change=self._reset_page)
+        with col2:
+            positions = st.multiselect("Position", list(frame["Position"].cat.categories),
+                                       key="table_positions", on_change=self._reset_page)
+        with col3:
+            clubs = st.multiselect("Club", list(frame["Club"].cat.categories),
+                                   key="table_clubs", on_change=self._reset_page)
+        
+        col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
+        with col1:
+            sort_by = st.selectbox("Sort by", [None] + BASE_COLUMNS + metric_columns,
+                                   format_func=lambda column: "File order" if column is None else column,
+                                   key="table_sort", on_change=self._reset_page)
+        with col2:
+            descending = st.toggle("Descending", key="table_descending", on_change=self._reset_page)
+        with col3:
+            show_metrics = st.toggle("Show metrics", key="table_metrics")
+        with col4:
+            page_size = st.selectbox("Rows per page", PAGE_SIZES, key="table_page_size",
+                                     on_change=self._reset_page)
+        
+        rows = self._view(frame, query, positions, clubs, sort_by, descending)
+        
+        # Paging
+        page_count = max(1, -(-len(rows) // page_size))
+        page = min(st.session_state.table_page, page_count)
+        st.session_state.table_page = page
+        
+        columns = BASE_COLUMNS + (metric_columns if show_metrics else [])
+        st.dataframe(
+            frame.iloc[rows[(page - 1) * page_size:page * page_size]][columns],
+            use_container_width=True
+        )
+        
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col1:
+            st.button("‹", key="table_prev", disabled=page <= 1,
+                      on_click=self._change_page, args=(-1,))
+        with col2:
+            st.caption(f"Page {page} of {page_count} · {len(rows)} of {len(frame)} players")
+        with col3:
+            st.button("›", key="table_next", disabled=page >= page_count,
+                      on_click=self._change_page, args=(1,))
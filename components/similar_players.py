@@ -0,0 +1,62 @@
+import streamlit as st
+import pandas as pd
+
+# Most search matches offered in the player picker
+MAX_OPTIONS = 50
+
+class SimilarPlayers:
+    """
+    Database tab panel: pick a player and list the players whose profiles
+    are closest, optionally within the same position group and an age range.
+    """
+    def __init__(self, repository, engine):
+        self.repository = repository
+        self.engine = engine
+    
+    def render(self):
+        """Render the player picker, filters and the nearest players"""
+        query = st.text_input("Find a player", placeholder="Name, club or county", key="similar_query")
+        matches = self.repository.search(query)[:MAX_OPTIONS] if query.strip() else []
+        if not matches:
+            st.caption("Search for a player to list the most similar profiles.")
+            return
+        
+        players = {str(p.get("id", p.get("name"))): p for p in matches}
+        player_id = st.selectbox(
+            "Player", list(players), key="similar_player",
+            format_func=lambda i: f"{players[i].get('name', 'Unknown')} · {players[i].get('position', 'Unknown')} · "
+                                  f"{players[i].get('clubName', 'Unknown')}"
+        )
+        player = players[player_id]
+        
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col1:
+            same_group = st.toggle("Same position group", value=True, key="similar_same_group")
+        with col2:
+            min_age, max_age = st.slider("Age", 5, 45, (5, 45), key="similar_ages")
+        with col3:
+            k = st.number_input("Players", min_value=1, max_value=50, value=10, key="similar_k")
+        
+        results = self.engine.similar(
+            player_id,
+            k=int(k),
+            category=self.engine.category_of(player) if same_group else None,
+            min_age=min_age if min_age > 5 else None,
+            max_age=max_age if max_age < 45 else None
+        )
+        if not results:
+            st.info("No players match these filters.")
+            return
+        
+        rows = []
+        for player_id, score in results:
+            match = self.repository.get(player_id)
+            if match is not None:
+                rows.append({
+                    "Name": match.get("name", "Unknown"),
+                    "Age": match.get("age"),
+                    "Position": match.get("position", "Unknown"),
+                    "Club": match.get("clubName", "Unknown"),
+                    "Similarity": round(score, 3),
+                })
+        st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
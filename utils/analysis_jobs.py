@@ -0,0 +1,255 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+
+from utils.instrumentation import perf
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+ERROR = "error"
+
+# Change-log key used for the team analysis
+TEAM = "__team__"
+
+class AnalysisJob:
+    """
+    One submitted analysis run. Holds the players in display order, each
+    player's status and checkpointed result, and a change log that the UI
+    polls with wait(). Workers update it from background threads.
+    """
+    def __init__(self, owner, players, keys, done_keys=(), team=False):
+        self.id = uuid.uuid4().hex
+        self.owner = owner
+        self.players = list(players)
+        self.keys = list(keys)
+        self.created_at = time.time()
+        self.finished_at = None
+        self.cancelled = False
+        
+        done_keys = set(done_keys)
+        self.status = {key: DONE if key in done_keys else PENDING for key in self.keys}
+        self.results = {}
+        self.partial = {}
+        self.errors = {}
+        
+        self.team_status = PENDING if team else None
+        self.team_analysis = ""
+        self.team_error = None
+        
+        self._cond = threading.Condition()
+        self._changes = []
+    
+    def _changed(self, key):
+        self._changes.append(key)
+        self._cond.notify_all()
+    
+    def start(self, key):
+        with self._cond:
+            self.status[key] = RUNNING
+            self._changed(key)
+    
+    def append(self, key, chunk):
+        with self._cond:
+            self.partial[key] = self.partial.get(key, "") + chunk
+            self._changed(key)
+    
+    def finish(self, key, result):
+        with self._cond:
+            self.status[key] = DONE
+            self.results[key] = result
+            self.partial.pop(key, None)
+            self._changed(key)
+    
+    def fail(self, key, error):
+        with self._cond:
+            self.status[key] = ERROR
+            self.errors[key] = str(error)
+            self.partial.pop(key, None)
+            self._changed(key)
+    
+    def team_append(self, chunk):
+        with self._cond:
+            self.team_status = RUNNING
+            self.team_analysis += chunk
+            self._changed(TEAM)
+    
+    def team_finish(self, analysis=None, error=None):
+        with self._cond:
+            if error is not None:
+                self.team_status = ERROR
+                self.team_error = str(error)
+            else:
+                self.team_status = DONE
+                self.team_analysis = analysis
+            self._changed(TEAM)
+    
+    def close(self):
+        with self._cond:
+            self.finished_at = time.time()
+            self._changed(None)
+    
+    @property
+    def finished(self):
+        return self.finished_at is not None
+    
+    def player_state(self, key):
+        """(status, text so far or final result, error) for one player"""
+        with self._cond:
+            status = self.status.get(key)
+            text = self.results.get(key) if status == DONE else self.partial.get(key, "")
+            return status, text, self.errors.get(key)
+    
+    def progress(self):
+        """(players finished, players total)"""
+        with self._cond:
+            finished = sum(1 for status in self.status.values() if status in (DONE, ERROR))
+            return finished, len(self.keys)
+    
+    def wait(self, cursor, timeout=None):
+        """
+        Block until something changed after cursor (or timeout) and return
+        (new cursor, changed keys in first-change order, finished).
+        """
+        with self._cond:
+            if cursor >= len(self._changes) and not self.finished:
+                self._cond.wait(timeout)
+            changed = list(dict.fromkeys(key for key in self._changes[cursor:] if key is not None))
+            return len(self._changes), changed, self.finished
+
+class AnalysisJobQueue:
+    """
+    Process-wide worker pool for analysis jobs, meant to be held in a
+    st.cache_resource singleton so jobs outlive reruns and disconnects.
+    Tasks are queued per owner (browser session) and workers take them
+    round-robin across owners, so one long squad analysis can't starve
+    other users.
+    """
+    def __init__(self, max_workers=4, retention=3600, idle_timeout=30):
+        self.max_workers = max(1, max_workers)
+        self.retention = retention
+        self.idle_timeout = idle_timeout
+        
+        self._cond = threading.Condition()
+        self._queues = OrderedDict()
+        self._jobs = {}
+        self._remaining = {}
+        self._final_tasks = {}
+        self._workers = 0
+        self._idle = 0
+    
+    def submit(self, job, tasks, final_task=None):
+        """
+        Queue a job's tasks (callables) under its owner. final_task runs after
+        every other task has finished, e.g. for the team summary.
+        """
+        with self._cond:
+            self._prune()
+            self._jobs[job.id] = job
+            self._remaining[job.id] = len(tasks)
+            if final_task is not None:
+                self._final_tasks[job.id] = final_task
+            
+            if tasks:
+                self._queues.setdefault(job.owner, deque()).extend((job, task) for task in tasks)
+            else:
+                self._task_done(job)
+            self._start_workers()
+        return job
+    
+    def get(self, job_id):
+        with self._cond:
+            return self._jobs.get(job_id)
+    
+    def cancel(self, job_id):
+        """Drop a job's queued tasks; tasks already running still finish"""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return
+            
+            job.cancelled = True
+            self._final_tasks.pop(job.id, None)
+            owner_queue = self._queues.get(job.owner)
+            if owner_queue:
+                kept = deque(item for item in owner_queue if item[0] is not job)
+                dropped = len(owner_queue) - len(kept)
+                if kept:
+                    self._queues[job.owner] = kept
+                else:
+                    del self._queues[job.owner]
+                self._remaining[job.id] -= dropped
+            
+            if self._remaining[job.id] <= 0:
+                self._task_done(job)
+    
+    def stats(self):
+        """Queue depth, worker count and active jobs"""
+        with self._cond:
+            return {
+                "queued_tasks": sum(len(owner_queue) for owner_queue in self._queues.values()),
+                "owners": len(self._queues),
+                "workers": self._workers,
+                "active_jobs": sum(1 for job in self._jobs.values() if not job.finished),
+            }
+    
+    def _prune(self):
+        """Forget finished jobs older than the retention period"""
+        cutoff = time.time() - self.retention
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job.finished and job.finished_at < cutoff]:
+            del self._jobs[job_id]
+            self._remaining.pop(job_id, None)
+    
+    def _start_workers(self):
+        queued = sum(len(owner_queue) for owner_queue in self._queues.values())
+        needed = min(self.max_workers - self._workers, queued - self._idle)
+        for _ in range(max(0, needed)):
+            self._workers += 1
+            threading.Thread(target=self._work, name=f"analysis-worker-{self._workers}", daemon=True).start()
+        self._cond.notify_all()
+    
+    def _next_task(self):
+        """Pop the next task, rotating across owners for fairness"""
+        owner, owner_queue = self._queues.popitem(last=False)
+        item = owner_queue.popleft()
+        if owner_queue:
+            self._queues[owner] = owner_queue
+        return item
+    
+    def _task_done(self, job):
+        """Account for a finished task; queue the final task or close the job"""
+        self._remaining[job.id] -= 1
+        if self._remaining[job.id] > 0:
+            return
+        
+        final_task = self._final_tasks.pop(job.id, None)
+        if final_task is not None and not job.cancelled:
+            # The final task jumps its owner's queue so results aren't delayed further
+            self._remaining[job.id] = 1
+            self._queues.setdefault(job.owner, deque()).appendleft((job, final_task))
+            self._queues.move_to_end(job.owner, last=False)
+            self._start_workers()
+        else:
+            job.close()
+    
+    def _work(self):
+        while True:
+            with self._cond:
+                if not self._queues:
+                    self._idle += 1
+                    self._cond.wait(self.idle_timeout)
+                    self._idle -= 1
+                    if not self._queues:
+                        self._workers -= 1
+                        return
+                job, task = self._next_task()
+            
+            try:
+                task()
+            except Exception:
+                perf.inc("analysis_task_errors_total")
+            
+            with self._cond:
+                self._task_done(job)
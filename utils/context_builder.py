@@ -0,0 +1,166 @@
+import math
+import re
+import threading
+from collections import defaultdict
+
+from utils.memory_backends import insight_hash
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+def tokenize(text):
+    """Lowercased word tokens (works for Arabic and English text)"""
+    return [token.lower() for token in TOKEN_PATTERN.findall(str(text))]
+
+def estimate_tokens(text):
+    """Rough LLM token count (about four characters per token)"""
+    return max(1, len(text) // 4)
+
+class BM25Index:
+    """
+    Incremental BM25 index. Documents can be added, replaced and removed
+    without rebuilding; queries only touch the postings of their own terms.
+    """
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._lengths = {}
+        self._terms = {}
+        self._postings = defaultdict(dict)
+        self._total_length = 0
+    
+    def add(self, doc_id, text):
+        """Index a document, replacing any previous version"""
+        self.remove(doc_id)
+        
+        frequencies = {}
+        tokens = tokenize(text)
+        for token in tokens:
+            frequencies[token] = frequencies.get(token, 0) + 1
+        
+        for term, tf in frequencies.items():
+            self._postings[term][doc_id] = tf
+        
+        self._terms[doc_id] = list(frequencies)
+        self._lengths[doc_id] = len(tokens)
+        self._total_length += len(tokens)
+    
+    def remove(self, doc_id):
+        """Drop a document from the index"""
+        if doc_id not in self._lengths:
+            return
+        
+        for term in self._terms.pop(doc_id):
+            postings = self._postings[term]
+            postings.pop(doc_id, None)
+            if not postings:
+                del self._postings[term]
+        
+        self._total_length -= self._lengths.pop(doc_id)
+    
+    def clear(self):
+        self.__init__(self.k1, self.b)
+    
+    def __len__(self):
+        return len(self._lengths)
+    
+    def search(self, query, top_k=10):
+        """Return [(doc_id, score)] for the best matching documents"""
+        doc_count = len(self._lengths)
+        if not doc_count:
+            return []
+        
+        avg_length = self._total_length / doc_count or 1
+        scores = {}
+        
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            
+            idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+
+class ContextBuilder:
+    """
+    Assembles the memory part of the chatbot prompt. Analyzed players and
+    team insights are kept in a BM25 index that follows SharedMemory updates,
+    and only the entries most relevant to the query are included, within a
+    token budget.
+    """
+    def __init__(self, memory, token_budget=1500, top_k=8, summary_chars=600):
+        self.token_budget = token_budget
+        self.top_k = top_k
+        self.summary_chars = summary_chars
+        
+        self._lock = threading.Lock()
+        self._index = BM25Index()
+        self._entries = {}
+        
+        memory.subscribe(self._on_memory_event)
+    
+    def _on_memory_event(self, event, payload):
+        """Keep the index in step with SharedMemory"""
+        with self._lock:
+            if event == "player":
+                doc_id = f"player:{payload.get('id')}"
+                self._index.add(doc_id, " ".join([
+                    str(payload.get('name', '')),
+                    str(payload.get('position', '')),
+                    str(payload.get('analysis_summary', ''))
+                ]))
+                self._entries.pop(doc_id, None)
+                self._entries[doc_id] = ("player", self._format_player(payload))
+            elif event == "remove_player":
+                doc_id = f"player:{payload}"
+                self._index.remove(doc_id)
+                self._entries.pop(doc_id, None)
+            elif event == "insight":
+                doc_id = f"insight:{insight_hash(payload)}"
+                self._index.add(doc_id, payload)
+                self._entries[doc_id] = ("insight", f"- {payload}")
+            elif event == "clear_insights":
+                for doc_id in [d for d, (kind, _) in self._entries.items() if kind == "insight"]:
+                    self._index.remove(doc_id)
+                    del self._entries[doc_id]
+            elif event == "clear":
+                self._index.clear()
+                self._entries = {}
+    
+    def _format_player(self, player_info):
+        summary = " ".join(str(player_info.get('analysis_summary', '')).split())
+        if len(summary) > self.summary_chars:
+            summary = summary[:self.summary_chars].rstrip() + "..."
+        return f"- {player_info.get('name', 'Unknown')} ({player_info.get('position', 'Unknown')}): {summary}"
+    
+    def build(self, query):
+        """Return the memory context for a query, ranked and within budget"""
+        with self._lock:
+            ranked = [doc_id for doc_id, _ in self._index.search(query, self.top_k)]
+            
+            # With no lexical match, fall back to the most recently stored entries
+            if not ranked:
+                ranked = list(self._entries)[-self.top_k:][::-1]
+            
+            sections = {"player": [], "insight": []}
+            remaining = self.token_budget
+            for doc_id in ranked:
+                kind, text = self._entries[doc_id]
+                cost = estimate_tokens(text)
+                if cost > remaining:
+                    # Trim the entry to whatever budget is left, then stop
+                    if remaining > 20:
+                        sections[kind].append(text[:remaining * 4].rstrip() + "...")
+                    break
+                sections[kind].append(text)
+                remaining -= cost
+        
+        memory_context = ""
+        if sections["player"]:
+            memory_context += "Previously analyzed players:\n" + "\n".join(sections["player"]) + "\n"
+        if sections["insight"]:
+            memory_context += "\nTeam insights:\n" + "\n".join(sections["insight"]) + "\n"
+        return memory_context
@@ -0,0 +1,243 @@
+import functools
+import logging
+import os
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Bucket upper bounds (seconds) for latency histograms
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Bucket upper bounds for prompt/response sizes (characters or tokens)
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144)
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style"""
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+    
+    def observe(self, value):
+        i = 0
+        while i < len(self.buckets) and value > self.buckets[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+    
+    def quantile(self, q):
+        """Estimate a quantile as the upper bound of the bucket containing it"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (self.max,), self.counts):
+            seen += count
+            if seen >= target:
+                return min(bound, self.max)
+        return self.max
+
+class _NullTimer:
+    """Shared no-op timer returned while instrumentation is disabled"""
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+class _Timer:
+    def __init__(self, owner, name, labels):
+        self.owner = owner
+        self.name = name
+        self.labels = labels
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc):
+        self.owner.observe(self.name, time.perf_counter() - self.start, self.labels)
+        return False
+
+class Instrumentation:
+    """
+    Process-wide latency/size histograms and counters for hot paths. When
+    disabled every call returns immediately, so instrumentation can stay in
+    place at negligible cost.
+    """
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._collectors = []
+        self._last_write = 0.0
+    
+    @staticmethod
+    def _key(name, labels):
+        return (name, tuple(sorted(labels.items())) if labels else ())
+    
+    def timer(self, name, labels=None):
+        """Context manager observing elapsed seconds into a latency histogram"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name, labels)
+    
+    def timed(self, name, labels=None):
+        """Decorator form of timer()"""
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                with _Timer(self, name, labels):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+    
+    def observe(self, name, value, labels=None, buckets=None):
+        """Record a value; names ending in _seconds default to latency buckets"""
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                if buckets is None:
+                    buckets = LATENCY_BUCKETS if name.endswith("_seconds") else SIZE_BUCKETS
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+    
+    def inc(self, name, amount=1, labels=None):
+        """Increment a counter"""
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+    
+    def add_collector(self, collector):
+        """Register collector() -> {name: value} for gauges read at export time"""
+        with self._lock:
+            self._collectors.append(collector)
+    
+    def _gauges(self):
+        gauges = {}
+        for collector in list(self._collectors):
+            try:
+                gauges.update(collector())
+            except Exception:
+                continue
+        return gauges
+    
+    def snapshot(self):
+        """Summary rows for display: one per histogram, counter and gauge"""
+        rows = []
+        with self._lock:
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                rows.append({
+                    "metric": name,
+                    "labels": ", ".join(f"{k}={v}" for k, v in labels),
+                    "count": histogram.count,
+                    "mean": histogram.total / histogram.count if histogram.count else 0.0,
+                    "p50": histogram.quantile(0.5),
+                    "p95": histogram.quantile(0.95),
+                    "max": histogram.max,
+                })
+            for (name, labels), value in sorted(self._counters.items()):
+                rows.append({"metric": name, "labels": ", ".join(f"{k}={v}" for k, v in labels), "count": value})
+        for name, value in sorted(self._gauges().items()):
+            rows.append({"metric": name, "labels": "", "value": value})
+        return rows
+    
+    def histogram_buckets(self, name, labels=None):
+        """[(bucket label, count)] for one histogram, empty if never observed"""
+        with self._lock:
+            histogram = self._histograms.get(self._key(name, labels))
+            if histogram is None:
+                return []
+            bounds = [f"≤{bound:g}" for bound in histogram.buckets] + [f">{histogram.buckets[-1]:g}"]
+            return list(zip(bounds, histogram.counts))
+    
+    def histogram_names(self):
+        """(name, labels) of every recorded histogram"""
+        with self._lock:
+            return sorted(self._histograms)
+    
+    def export_prometheus(self):
+        """Render every metric in the Prometheus text exposition format"""
+        def fmt_labels(labels, extra=None):
+            pairs = list(labels) + ([extra] if extra else [])
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+        
+        lines = []
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+            
+            declared = set()
+            for (name, labels), histogram in histograms:
+                if name not in declared:
+                    lines.append(f"# TYPE {name} histogram")
+                    declared.add(name)
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{fmt_labels(labels, ('le', bound))} {cumulative}")
+                lines.append(f"{name}_bucket{fmt_labels(labels, ('le', '+Inf'))} {histogram.count}")
+                lines.append(f"{name}_sum{fmt_labels(labels)} {histogram.total}")
+                lines.append(f"{name}_count{fmt_labels(labels)} {histogram.count}")
+            
+            for (name, labels), value in counters:
+                if name not in declared:
+                    lines.append(f"# TYPE {name} counter")
+                    declared.add(name)
+                lines.append(f"{name}{fmt_labels(labels)} {value}")
+        
+        for name, value in sorted(self._gauges().items()):
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+    
+    def write_prometheus(self, path, min_interval=0.0):
+        """Write the Prometheus text file (atomically), at most once per min_interval"""
+        if not self.enabled:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_write < min_interval:
+                return
+            self._last_write = now
+        
+        # A unique temp file per call, so concurrent writers never replace each other's file;
+        # a failed export is logged rather than breaking the caller
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(self.export_prometheus())
+            # mkstemp creates the file private; keep the export readable by collectors
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("Failed to write Prometheus metrics to %s: %s", path, e)
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+            self._counters = {}
+
+# Process-wide instance; PERF_METRICS=0 disables all recording
+perf = Instrumentation(enabled=os.getenv("PERF_METRICS", "1") != "0")
@@ -0,0 +1,207 @@
+import threading
+import time
+
+from utils.context_builder import estimate_tokens
+from utils.instrumentation import perf
+from utils.resilience import backoff_delay, is_overload, is_retryable
+from utils.single_flight import SingleFlight
+
+DEFAULT_MODEL = "gemini-2.0-flash"
+
+def response_text(response):
+    """Text of a response or stream chunk; empty when it has no text parts (e.g. a blocked or final chunk)"""
+    try:
+        return response.text
+    except (ValueError, IndexError):
+        return ""
+
+class LLMClient:
+    """
+    Wrapper around the Gemini client shared by the analysis tool and chatbot.
+    Responses are served from the optional ResponseCache when available,
+    keyed by the prompt or by an explicit cache_key when parts of the prompt
+    shouldn't invalidate a cached response.
+    Upstream calls go through an optional TokenBucket rate limiter,
+    AdaptiveConcurrency limit and CircuitBreaker, and transient errors are
+    retried with jittered exponential backoff. Identical requests made
+    concurrently (e.g. two sessions analyzing the same player) share one
+    upstream call through SingleFlight. With client_factory instead of a
+    client, the SDK is only loaded on first use (or by warm_up).
+    """
+    def __init__(self, client=None, cache=None, model=DEFAULT_MODEL, rate_limiter=None, concurrency=None,
+                 breaker=None, max_retries=3, backoff_base=0.5, backoff_cap=20.0, client_factory=None):
+        self._client = client
+        self._client_factory = client_factory
+        self._client_lock = threading.Lock()
+        self._generative_model = None
+        self.cache = cache
+        self.model = model
+        self.rate_limiter = rate_limiter
+        self.concurrency = concurrency
+        self.breaker = breaker
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.flights = SingleFlight()
+    
+    @property
+    def client(self):
+        """The Gemini client, created by client_factory on first access"""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    with perf.timer("llm_client_load_seconds"):
+                        self._client = self._client_factory()
+        return self._client
+    
+    def warm_up(self):
+        """Load the client ahead of the first request"""
+        return self.client is not None
+    
+    def _acquire(self):
+        """Admit one upstream call: breaker check, rate limit, then a concurrency slot"""
+        if self.breaker is not None:
+            self.breaker.before_call()
+        if self.rate_limiter is not None:
+            waited = self.rate_limiter.acquire()
+            if waited:
+                perf.observe("llm_rate_limit_wait_seconds", waited)
+        if self.concurrency is not None:
+            self.concurrency.acquire()
+    
+    def _release(self, error=None, abandoned=False):
+        """Free the slot and feed the outcome to the concurrency limit and breaker"""
+        if self.concurrency is not None:
+            self.concurrency.release()
+        
+        # An abandoned call (the consumer stopped early) says nothing about the service
+        if abandoned:
+            if self.breaker is not None:
+                self.breaker.on_abandon()
+            return
+        
+        if self.concurrency is not None:
+            if error is None:
+                self.concurrency.on_success()
+            elif is_overload(error):
+                self.concurrency.on_overload()
+        
+        if self.breaker is not None:
+            # Only transient errors count against the breaker; anything else means the service answered
+            if error is not None and is_retryable(error):
+                self.breaker.on_failure()
+            else:
+                self.breaker.on_success()
+    
+    def _should_retry(self, error, attempt):
+        """Back off and return True if a failed call should be tried again"""
+        if attempt >= self.max_retries or not is_retryable(error):
+            return False
+        perf.inc("llm_retries_total")
+        time.sleep(backoff_delay(attempt, self.backoff_base, self.backoff_cap))
+        return True
+    
+    def _cached(self, prompt, kind, cache_key=None):
+        """Look the prompt (or cache_key) up in the cache, recording prompt size and the hit/miss"""
+        if perf.enabled:
+            perf.observe("llm_prompt_chars", len(prompt), {"kind": kind})
+            perf.observe("llm_prompt_tokens", estimate_tokens(prompt), {"kind": kind})
+        
+        if self.cache is None:
+            return None
+        
+        cached = self.cache.get(self.model, cache_key or prompt)
+        perf.inc("llm_cache_lookups_total", labels={"result": "miss" if cached is None else "hit"})
+        return cached
+    
+    def _record_response(self, text, kind, started):
+        if perf.enabled:
+            perf.observe("llm_request_seconds", time.perf_counter() - started, {"kind": kind})
+            perf.observe("llm_response_chars", len(text), {"kind": kind})
+            perf.observe("llm_response_tokens", estimate_tokens(text), {"kind": kind})
+    
+    def _model(self):
+        """GenerativeModel for self.model, created once"""
+        if self._generative_model is None:
+            self._generative_model = self.client.GenerativeModel(self.model)
+        return self._generative_model
+    
+    def generate(self, prompt, tag=None, cache_key=None):
+        """Generate a completion for a prompt, using the cache if configured"""
+        cached = self._cached(prompt, "generate", cache_key)
+        if cached is not None:
+            return cached
+        
+        return self.flights.do(
+            ("generate", self.model, prompt),
+            lambda: self._generate(prompt, tag, cache_key)
+        )
+    
+    def _generate(self, prompt, tag, cache_key=None):
+        """Call the API (with retries) and cache the completion"""
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            self._acquire()
+            try:
+                text = response_text(self._model().generate_content(prompt))
+            except Exception as e:
+                self._release(e)
+                if self._should_retry(e, attempt):
+                    attempt += 1
+                    continue
+                raise
+            self._release()
+            break
+        self._record_response(text or "", "generate", started)
+        
+        if self.cache is not None and text:
+            self.cache.put(self.model, cache_key or prompt, text, tag=tag)
+        
+        return text
+    
+    def stream(self, prompt, tag=None, cache_key=None):
+        """Yield the completion for a prompt chunk by chunk as tokens arrive"""
+        cached = self._cached(prompt, "stream", cache_key)
+        if cached is not None:
+            yield cached
+            return
+        
+        yield from self.flights.stream(
+            ("stream", self.model, prompt),
+            lambda: self._stream(prompt, tag, cache_key)
+        )
+    
+    def _stream(self, prompt, tag, cache_key=None):
+        """Stream from the API (retrying before the first chunk) and cache the completion"""
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            self._acquire()
+            parts = []
+            try:
+                for chunk in self._model().generate_content(prompt, stream=True):
+                    text = response_text(chunk)
+                    if text:
+                        if not parts:
+                            perf.observe("llm_first_chunk_seconds", time.perf_counter() - started)
+                        parts.append(text)
+                        yield text
+            except Exception as e:
+                self._release(e)
+                # Text already yielded can't be taken back, so only retry before the first chunk
+                if not parts and self._should_retry(e, attempt):
+                    attempt += 1
+                    continue
+                raise
+            except BaseException:
+                # The consumer stopped early (GeneratorExit) or the process is exiting: no outcome
+                self._release(abandoned=True)
+                raise
+            self._release()
+            break
+        
+        self._record_response("".join(parts), "stream", started)
+        
+        if self.cache is not None and parts:
+            self.cache.put(self.model, cache_key or prompt, "".join(parts), tag=tag)
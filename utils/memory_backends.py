@@ -0,0 +1,251 @@
+import atexit
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+def insight_hash(insight):
+    """Content hash used to deduplicate team insights"""
+    return hashlib.sha1(str(insight).encode('utf-8')).hexdigest()
+
+class InMemoryBackend:
+    """
+    Storage backend keeping everything in process memory. Analyzed players
+    live in an id-keyed dict (insertion order preserved) and team insights
+    are deduplicated by hash.
+    """
+    # Only this process reads and writes it
+    shared = False
+    
+    def __init__(self):
+        self.clear()
+    
+    def clear(self):
+        self._players = {}
+        self._insight_hashes = set()
+        self._insights = []
+        self._position_distribution = {}
+        self._values = {'age_patterns': []}
+    
+    def _adjust_position(self, pos, delta):
+        """Apply a delta to the position distribution, dropping empty positions"""
+        count = self._position_distribution.get(pos, 0) + delta
+        if count > 0:
+            self._position_distribution[pos] = count
+        else:
+            self._position_distribution.pop(pos, None)
+    
+    def upsert_player(self, player_info):
+        player_id = player_info.get('id')
+        pos = player_info.get('position', 'Unknown')
+        previous = self._players.get(player_id)
+        
+        if previous is None:
+            self._adjust_position(pos, 1)
+        else:
+            # Move the player between positions if it changed
+            previous_pos = previous.get('position', 'Unknown')
+            if previous_pos != pos:
+                self._adjust_position(previous_pos, -1)
+                self._adjust_position(pos, 1)
+        
+        # Updating an existing key keeps its original insertion order
+        self._players[player_id] = player_info
+    
+    def remove_player(self, player_id):
+        previous = self._players.pop(player_id, None)
+        if previous is not None:
+            self._adjust_position(previous.get('position', 'Unknown'), -1)
+        return previous is not None
+    
+    def get_player(self, player_id, default=None):
+        return self._players.get(player_id, default)
+    
+    def list_players(self):
+        return list(self._players.values())
+    
+    def position_distribution(self):
+        return dict(self._position_distribution)
+    
+    def add_insight(self, insight):
+        digest = insight_hash(insight)
+        if digest not in self._insight_hashes:
+            self._insight_hashes.add(digest)
+            self._insights.append(insight)
+    
+    def list_insights(self):
+        return list(self._insights)
+    
+    def clear_insights(self):
+        self._insight_hashes = set()
+        self._insights = []
+    
+    def get_value(self, key, default=None):
+        return self._values.get(key, default)
+    
+    def set_value(self, key, value):
+        self._values[key] = value
+    
+    def flush(self):
+        pass
+
+class SQLiteBackend:
+    """
+    Storage backend persisting memory to SQLite in WAL mode so several
+    server processes can share it and it survives restarts. Writes are
+    buffered and committed in batches, at the latest flush_interval seconds
+    after the first buffered write; reads flush pending writes first and go
+    through indexed queries.
+    """
+    # Other processes may write the same file
+    shared = True
+    
+    def __init__(self, path="shared_memory.sqlite3", batch_size=50, flush_interval=1.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        
+        self._lock = threading.RLock()
+        self._pending = []
+        self._last_flush = time.monotonic()
+        self._timer = None
+        
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS analyzed_players (
+                id TEXT PRIMARY KEY,
+                seq INTEGER NOT NULL,
+                position TEXT NOT NULL,
+                info TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_players_seq ON analyzed_players(seq);
+            CREATE INDEX IF NOT EXISTS idx_players_position ON analyzed_players(position);
+            CREATE TABLE IF NOT EXISTS team_insights (
+                hash TEXT PRIMARY KEY,
+                seq INTEGER NOT NULL,
+                insight TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_insights_seq ON team_insights(seq);
+            CREATE TABLE IF NOT EXISTS memory_values (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+        """)
+        
+        # Don't lose a partially filled batch on shutdown
+        atexit.register(self.flush)
+    
+    def _write(self, sql, params=()):
+        """Queue a write and flush once the batch is full or old enough"""
+        with self._lock:
+            self._pending.append((sql, params))
+            if (len(self._pending) >= self.batch_size
+                    or time.monotonic() - self._last_flush >= self.flush_interval):
+                self.flush()
+            elif self._timer is None:
+                # Commit a quiet buffer in the background so other processes see it soon
+                self._timer = threading.Timer(self.flush_interval, self._flush_later)
+                self._timer.daemon = True
+                self._timer.start()
+    
+    def _flush_later(self):
+        """Timer callback: commit whatever is still buffered"""
+        with self._lock:
+            self._timer = None
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Background flush of %s failed", self.path)
+    
+    def flush(self):
+        """Commit all pending writes in a single transaction"""
+        with self._lock:
+            self._last_flush = time.monotonic()
+            if not self._pending:
+                return
+            
+            pending, self._pending = self._pending, []
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for sql, params in pending:
+                    self._conn.execute(sql, params)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+    
+    def _query(self, sql, params=()):
+        """Run a read after flushing this process's pending writes"""
+        with self._lock:
+            self.flush()
+            return self._conn.execute(sql, params).fetchall()
+    
+    def clear(self):
+        with self._lock:
+            self._pending = []
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute("DELETE FROM analyzed_players")
+            self._conn.execute("DELETE FROM team_insights")
+            self._conn.execute("DELETE FROM memory_values")
+            self._conn.execute("COMMIT")
+    
+    def upsert_player(self, player_info):
+        # seq is only set on first insert, so updates keep the original order; rewriting
+        # an identical entry (another process already stored it) is a no-op
+        self._write(
+            "INSERT INTO analyzed_players (id, seq, position, info) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET position = excluded.position, info = excluded.info "
+            "WHERE analyzed_players.info != excluded.info",
+            (
+                str(player_info.get('id')),
+                time.time_ns(),
+                player_info.get('position', 'Unknown'),
+                json.dumps(player_info, ensure_ascii=False, default=str)
+            )
+        )
+    
+    def remove_player(self, player_id):
+        existed = self.get_player(player_id) is not None
+        self._write("DELETE FROM analyzed_players WHERE id = ?", (str(player_id),))
+        return existed
+    
+    def get_player(self, player_id, default=None):
+        rows = self._query("SELECT info FROM analyzed_players WHERE id = ?", (str(player_id),))
+        return json.loads(rows[0][0]) if rows else default
+    
+    def list_players(self):
+        rows = self._query("SELECT info FROM analyzed_players ORDER BY seq")
+        return [json.loads(info) for (info,) in rows]
+    
+    def position_distribution(self):
+        rows = self._query("SELECT position, COUNT(*) FROM analyzed_players GROUP BY position")
+        return dict(rows)
+    
+    def add_insight(self, insight):
+        self._write(
+            "INSERT OR IGNORE INTO team_insights (hash, seq, insight) VALUES (?, ?, ?)",
+            (insight_hash(insight), time.time_ns(), insight)
+        )
+    
+    def list_insights(self):
+        rows = self._query("SELECT insight FROM team_insights ORDER BY seq")
+        return [insight for (insight,) in rows]
+    
+    def clear_insights(self):
+        self._write("DELETE FROM team_insights")
+    
+    def get_value(self, key, default=None):
+        rows = self._query("SELECT value FROM memory_values WHERE key = ?", (key,))
+        return json.loads(rows[0][0]) if rows else default
+    
+    def set_value(self, key, value):
+        self._write(
+            "INSERT OR REPLACE INTO memory_values (key, value) VALUES (?, ?)",
+            (key, json.dumps(value, ensure_ascii=False, default=str))
+        )
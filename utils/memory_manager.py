@@ -1,51 +1,126 @@
+import hashlib
+import json
+import threading
+
+from utils.memory_backends import InMemoryBackend
+
+def _fingerprint(player_info):
+    """Content hash of a player entry, independent of key order"""
+    return hashlib.sha1(json.dumps(player_info, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
 class SharedMemory:
     """
-    Shared memory class to maintain state between chatbot and analysis tool
+    Shared memory class to maintain state between chatbot and analysis tool.
+    Storage is delegated to a pluggable backend (in-memory by default, or
+    SQLiteBackend to share memory across processes and restarts); every
+    access is guarded by a lock because one instance is shared by all sessions.
     """
-    def __init__(self):
-        self.memory = {
-            'analyzed_players': [],
-            'team_insights': [],
-            'position_distribution': {},
-            'age_patterns': []
-        }
+    def __init__(self, backend=None):
+        self.backend = backend if backend is not None else InMemoryBackend()
+        self._lock = threading.RLock()
+        self._listeners = []
+        
+        # Fingerprint of every player entry written through this instance, so repeated writes
+        # are skipped without a backend read. Only for process-local backends: other processes
+        # can change a shared store, whose upsert skips identical rows itself
+        self._written = None if self.backend.shared else {}
+    
+    def subscribe(self, listener, replay=True):
+        """
+        Register listener(event, payload) for changes made through this instance.
+        Events are "player", "remove_player", "insight", "clear_insights" and
+        "clear"; with replay the current contents are delivered first so
+        indexes can bootstrap.
+        """
+        with self._lock:
+            self._listeners.append(listener)
+            if replay:
+                for player_info in self.backend.list_players():
+                    listener("player", player_info)
+                for insight in self.backend.list_insights():
+                    listener("insight", insight)
+    
+    def _notify(self, event, payload=None):
+        for listener in self._listeners:
+            listener(event, payload)
     
     def add_analyzed_player(self, player_info):
-        """Add a player to analyzed players list"""
-        # Check if player already exists
-        player_ids = [p.get('id') for p in self.memory['analyzed_players']]
-        if player_info.get('id') in player_ids:
-            # Update existing player
-            for i, player in enumerate(self.memory['analyzed_players']):
-                if player.get('id') == player_info.get('id'):
-                    self.memory['analyzed_players'][i] = player_info
-                    break
-        else:
-            # Add new player
-            self.memory['analyzed_players'].append(player_info)
-            
-            # Update position distribution
-            pos = player_info.get('position', 'Unknown')
-            self.memory['position_distribution'][pos] = self.memory['position_distribution'].get(pos, 0) + 1
+        """Add or update a player in the analyzed players (unchanged entries aren't rewritten)"""
+        with self._lock:
+            # Sessions that shared one analysis all checkpoint it; only the first write lands
+            if self._written is not None:
+                fingerprint = _fingerprint(player_info)
+                if self._written.get(player_info.get('id')) == fingerprint:
+                    return
+                self._written[player_info.get('id')] = fingerprint
+            self.backend.upsert_player(player_info)
+            self._notify("player", player_info)
+    
+    def get_analyzed_player(self, player_id, default=None):
+        """Get a single analyzed player by id"""
+        with self._lock:
+            return self.backend.get_player(player_id, default)
+    
+    def remove_analyzed_player(self, player_id):
+        """Forget a player's analysis; returns whether it was stored"""
+        with self._lock:
+            if self._written is not None:
+                self._written.pop(player_id, None)
+            removed = self.backend.remove_player(player_id)
+            if removed:
+                self._notify("remove_player", player_id)
+            return removed
     
     def add_team_insight(self, insight):
         """Add a team insight to memory"""
-        if insight not in self.memory['team_insights']:
-            self.memory['team_insights'].append(insight)
+        with self._lock:
+            self.backend.add_insight(insight)
+            self._notify("insight", insight)
     
     def get(self, key, default=None):
-        """Get a value from memory"""
-        return self.memory.get(key, default)
+        """Get a value from memory (a snapshot copy for collections)"""
+        with self._lock:
+            if key == 'analyzed_players':
+                return self.backend.list_players()
+            if key == 'team_insights':
+                return self.backend.list_insights()
+            if key == 'position_distribution':
+                return self.backend.position_distribution()
+            
+            value = self.backend.get_value(key, default)
+            if isinstance(value, list):
+                return list(value)
+            if isinstance(value, dict):
+                return dict(value)
+            return value
     
     def set(self, key, value):
         """Set a value in memory"""
-        self.memory[key] = value
+        with self._lock:
+            if key == 'analyzed_players':
+                for player_info in self.backend.list_players():
+                    self.remove_analyzed_player(player_info.get('id'))
+                for player_info in value:
+                    self.add_analyzed_player(player_info)
+            elif key == 'team_insights':
+                self.backend.clear_insights()
+                self._notify("clear_insights")
+                for insight in value:
+                    self.add_team_insight(insight)
+            elif key == 'position_distribution':
+                raise ValueError("position_distribution is derived from the analyzed players")
+            else:
+                self.backend.set_value(key, value)
+    
+    def flush(self):
+        """Persist any buffered writes"""
+        with self._lock:
+            self.backend.flush()
     
     def clear(self):
         """Clear memory"""
-        self.memory = {
-            'analyzed_players': [],
-            'team_insights': [],
-            'position_distribution': {},
-            'age_patterns': []
-        }
\ No newline at end of file
+        with self._lock:
+            self.backend.clear()
+            if self._written is not None:
+                self._written.clear()
+            self._notify("clear")
@@ -0,0 +1,216 @@
+import threading
+
+import numpy as np
+
+from utils.player_records import metric_names, performance_matrix
+from utils.player_repository import age_bucket
+
+class MetricsEngine:
+    """
+    Vectorized cohort statistics over every player's performanceData (plus
+    tps). Metrics are held in a dense float matrix with NaN for missing
+    values; percentiles and z-scores are computed per position and per age
+    bucket, and only the affected cohorts are recomputed when a player changes.
+    """
+    def __init__(self, players):
+        self._lock = threading.RLock()
+        
+        self.metrics = sorted(metric_names(players)) + ["tps"]
+        self._metric_index = {metric: i for i, metric in enumerate(self.metrics)}
+        
+        # Cohort labels are stored as integer codes so cohort rows can be selected vectorized
+        self._codes = {"position": {}, "age": {}}
+        self._rows = {}
+        self._size = 0
+        capacity = max(len(players), 1)
+        self._values = np.full((capacity, len(self.metrics)), np.nan)
+        self._cohorts = {
+            "position": np.full(capacity, -1, dtype=np.int32),
+            "age": np.full(capacity, -1, dtype=np.int32),
+        }
+        
+        self._load(players)
+        
+        shape = self._values.shape
+        self._stats = {
+            "position_percentile": np.full(shape, np.nan),
+            "position_z": np.full(shape, np.nan),
+            "age_percentile": np.full(shape, np.nan),
+            "age_z": np.full(shape, np.nan),
+        }
+        self._recompute("position", set(self._codes["position"].values()))
+        self._recompute("age", set(self._codes["age"].values()))
+    
+    def _load(self, players):
+        """Bulk-fill the matrix and cohort codes in one pass"""
+        perf_metrics = self.metrics[:-1]
+        for row, player in enumerate(players):
+            self._rows[str(player.get("id", player.get("name")))] = row
+        
+        # Packed records are copied as whole arrays; anything else is read metric by metric
+        values = performance_matrix(players, perf_metrics, ["tps"])
+        if values is None:
+            nan = float("nan")
+            rows = []
+            for player in players:
+                data = player.get("performanceData") or {}
+                rows.append([data.get(metric, nan) for metric in perf_metrics] + [player.get("tps", nan)])
+            
+            try:
+                values = np.array(rows, dtype=float).reshape(len(rows), len(self.metrics))
+            except (TypeError, ValueError):
+                # Fall back to per-player parsing when some values aren't numeric
+                values = np.array([self._player_vector(player) for player in players]).reshape(len(rows), len(self.metrics))
+        
+        self._size = len(players)
+        self._values[:self._size] = values
+        self._cohorts["position"][:self._size] = [
+            self._code("position", player.get("position", "Unknown")) for player in players
+        ]
+        self._cohorts["age"][:self._size] = [
+            self._code("age", age_bucket(player.get("age"))) for player in players
+        ]
+    
+    def _player_vector(self, player):
+        """Dense metric vector for a player, NaN where a metric is missing"""
+        vector = np.full(len(self.metrics), np.nan)
+        data = dict(player.get("performanceData") or {})
+        data["tps"] = player.get("tps")
+        
+        for metric, value in data.items():
+            i = self._metric_index.get(metric)
+            if i is None:
+                continue
+            try:
+                vector[i] = float(value)
+            except (TypeError, ValueError):
+                pass
+        return vector
+    
+    def _write_row(self, player):
+        """Store a player's vector, growing the matrix when full"""
+        player_id = str(player.get("id", player.get("name")))
+        row = self._rows.get(player_id)
+        
+        if row is None:
+            row = self._size
+            if row >= self._values.shape[0]:
+                self._grow(row * 2)
+            self._rows[player_id] = row
+            self._size += 1
+        
+        self._values[row] = self._player_vector(player)
+        self._cohorts["position"][row] = self._code("position", player.get("position", "Unknown"))
+        self._cohorts["age"][row] = self._code("age", age_bucket(player.get("age")))
+        return row
+    
+    def _code(self, kind, label):
+        codes = self._codes[kind]
+        if label not in codes:
+            codes[label] = len(codes)
+        return codes[label]
+    
+    def _grow(self, capacity):
+        extra = capacity - self._values.shape[0]
+        pad = np.full((extra, len(self.metrics)), np.nan)
+        self._values = np.vstack([self._values, pad])
+        for name, matrix in getattr(self, "_stats", {}).items():
+            self._stats[name] = np.vstack([matrix, pad])
+        for kind, codes in self._cohorts.items():
+            self._cohorts[kind] = np.concatenate([codes, np.full(extra, -1, dtype=np.int32)])
+    
+    def _recompute(self, kind, cohorts):
+        """Recompute percentiles and z-scores for the given cohorts"""
+        percentile = self._stats[f"{kind}_percentile"]
+        zscore = self._stats[f"{kind}_z"]
+        
+        for cohort in cohorts:
+            rows = np.nonzero(self._cohorts[kind] == cohort)[0]
+            if not len(rows):
+                continue
+            
+            block = self._values[rows]
+            valid = ~np.isnan(block)
+            counts = valid.sum(axis=0)
+            
+            # Z-scores per metric within the cohort
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mean = np.nansum(block, axis=0) / counts
+                std = np.sqrt(np.nansum((block - mean) ** 2, axis=0) / counts)
+                z = np.where(std > 0, (block - mean) / std, 0.0)
+            zscore[rows] = np.where(valid, z, np.nan)
+            
+            # Percentile rank per metric: share of the cohort below, ties counted half
+            # (NaNs sort last, so the first counts[col] entries of each column are the present values)
+            orders = np.argsort(block, axis=0)
+            ranks = np.full(block.shape, np.nan)
+            for col in np.nonzero(counts)[0]:
+                order = orders[:counts[col], col]
+                ordered = block[order, col]
+                below = np.searchsorted(ordered, ordered, side="left")
+                upto = np.searchsorted(ordered, ordered, side="right")
+                ranks[order, col] = (below + upto) * 0.5 / counts[col] * 100
+            percentile[rows] = ranks
+    
+    def apply_changes(self, updated_players, removed_ids=()):
+        """Apply a batch of updates and removals, recomputing each touched cohort once"""
+        with self._lock:
+            touched = {kind: set() for kind in self._cohorts}
+            
+            for player_id in removed_ids:
+                row = self._rows.pop(str(player_id), None)
+                if row is None:
+                    continue
+                # The row is left empty and excluded from every cohort
+                self._values[row] = np.nan
+                for matrix in self._stats.values():
+                    matrix[row] = np.nan
+                for kind, codes in self._cohorts.items():
+                    touched[kind].add(int(codes[row]))
+                    codes[row] = -1
+            
+            for player in updated_players:
+                row = self._rows.get(str(player.get("id", player.get("name"))))
+                if row is not None:
+                    for kind, codes in self._cohorts.items():
+                        touched[kind].add(int(codes[row]))
+                row = self._write_row(player)
+                for kind, codes in self._cohorts.items():
+                    touched[kind].add(int(codes[row]))
+            
+            for kind, cohorts in touched.items():
+                self._recompute(kind, cohorts - {-1})
+    
+    def player_profile(self, player_id):
+        """Per-metric value, percentiles and z-scores for one player"""
+        with self._lock:
+            row = self._rows.get(str(player_id))
+            if row is None:
+                return None
+            
+            profile = {}
+            for i, metric in enumerate(self.metrics):
+                value = self._values[row, i]
+                if np.isnan(value):
+                    continue
+                profile[metric] = {
+                    "value": float(value),
+                    "position_percentile": float(self._stats["position_percentile"][row, i]),
+                    "position_z": float(self._stats["position_z"][row, i]),
+                    "age_percentile": float(self._stats["age_percentile"][row, i]),
+                    "age_z": float(self._stats["age_z"][row, i]),
+                }
+            return profile
+    
+    def format_for_prompt(self, player_id):
+        """Compact text summary of a player's cohort standing for LLM prompts"""
+        profile = self.player_profile(player_id)
+        if not profile:
+            return ""
+        
+        return "\n".join(
+            f"{metric}: {stats['value']:g} "
+            f"(position pct {stats['position_percentile']:.0f}, z {stats['position_z']:+.2f}; "
+            f"age-group pct {stats['age_percentile']:.0f}, z {stats['age_z']:+.2f})"
+            for metric, stats in profile.items()
+        )
@@ -0,0 +1,369 @@
+import array
+import codecs
+import hashlib
+import json
+import os
+import pickle
+from collections.abc import Mapping
+
+# Largest integer a float64 slot stores exactly
+_MAX_EXACT_INT = 2 ** 53
+
+_NUMBER_TYPES = {int, float}
+
+class _Schema:
+    """Field names shared by every record with the same keys"""
+    __slots__ = ("keys", "index")
+    
+    def __init__(self, keys):
+        self.keys = keys
+        self.index = {key: i for i, key in enumerate(keys)}
+
+_schemas = {}
+
+def _schema_for(keys):
+    schema = _schemas.get(keys)
+    if schema is None:
+        schema = _schemas[keys] = _Schema(keys)
+    return schema
+
+class PerformanceData(Mapping):
+    """
+    Read-only metric mapping packed into a float64 array. A bit mask
+    remembers which values were integers so they round-trip unchanged.
+    """
+    __slots__ = ("_schema", "_values", "_ints")
+    
+    def __init__(self, keys, values, ints=0):
+        self._schema = _schema_for(keys)
+        self._values = values if isinstance(values, array.array) else array.array("d", values)
+        self._ints = ints
+    
+    @classmethod
+    def pack(cls, data):
+        """Packed copy of a metrics dict, or None when a value isn't a plain number"""
+        values = list(data.values())
+        types = set(map(type, values))
+        if not types <= _NUMBER_TYPES:
+            return None
+        
+        ints = 0
+        if int in types:
+            for i, value in enumerate(values):
+                if type(value) is int:
+                    if not -_MAX_EXACT_INT < value < _MAX_EXACT_INT:
+                        return None
+                    ints |= 1 << i
+        return cls(tuple(data), values, ints)
+    
+    def _value(self, i):
+        value = self._values[i]
+        return int(value) if self._ints >> i & 1 else value
+    
+    def __getitem__(self, key):
+        i = self._schema.index.get(key)
+        if i is None:
+            raise KeyError(key)
+        return self._value(i)
+    
+    def get(self, key, default=None):
+        i = self._schema.index.get(key)
+        return default if i is None else self._value(i)
+    
+    def __contains__(self, key):
+        return key in self._schema.index
+    
+    def __iter__(self):
+        return iter(self._schema.keys)
+    
+    def __len__(self):
+        return len(self._values)
+    
+    def __eq__(self, other):
+        if isinstance(other, PerformanceData) and other._schema is self._schema:
+            return self._values == other._values and self._ints == other._ints
+        return Mapping.__eq__(self, other)
+    
+    __hash__ = None
+    
+    def to_dict(self):
+        return {key: self._value(i) for i, key in enumerate(self._schema.keys)}
+    
+    def __repr__(self):
+        return repr(self.to_dict())
+    
+    def __reduce__(self):
+        return (PerformanceData, (self._schema.keys, self._values, self._ints))
+
+class PlayerRecord(Mapping):
+    """
+    Immutable, compact player record with the read interface of a dict.
+    Field names live in a shared schema and the values in one tuple, so a
+    record costs a fraction of the parsed JSON object.
+    """
+    __slots__ = ("_schema", "_values")
+    
+    def __init__(self, keys, values):
+        self._schema = _schema_for(keys)
+        self._values = tuple(values)
+    
+    def __getitem__(self, key):
+        i = self._schema.index.get(key)
+        if i is None:
+            raise KeyError(key)
+        return self._values[i]
+    
+    def get(self, key, default=None):
+        i = self._schema.index.get(key)
+        return default if i is None else self._values[i]
+    
+    def __contains__(self, key):
+        return key in self._schema.index
+    
+    def __iter__(self):
+        return iter(self._schema.keys)
+    
+    def __len__(self):
+        return len(self._values)
+    
+    def items(self):
+        return zip(self._schema.keys, self._values)
+    
+    def __eq__(self, other):
+        if isinstance(other, PlayerRecord) and other._schema is self._schema:
+            return self._values == other._values
+        return Mapping.__eq__(self, other)
+    
+    __hash__ = None
+    
+    def to_dict(self):
+        """Plain (JSON-serializable) dict copy of the record"""
+        return {
+            key: value.to_dict() if isinstance(value, PerformanceData) else value
+            for key, value in zip(self._schema.keys, self._values)
+        }
+    
+    def __repr__(self):
+        return repr(self.to_dict())
+    
+    def __reduce__(self):
+        return (PlayerRecord, (self._schema.keys, self._values))
+
+def compact_player(player, strings=None):
+    """
+    Convert a parsed player dict to a PlayerRecord. Repeated short strings
+    (positions, clubs, counties...) are shared through the strings memo.
+    """
+    if strings is None:
+        strings = {}
+    
+    values = []
+    for value in player.values():
+        kind = type(value)
+        if kind is str:
+            if len(value) <= 64:
+                value = strings.setdefault(value, value)
+        elif kind is dict:
+            value = PerformanceData.pack(value) or compact_player(value, strings)
+        elif kind is list:
+            value = tuple(value)
+        values.append(value)
+    return PlayerRecord(tuple(player), values)
+
+def metric_names(players):
+    """Every performanceData key across players (packed records are read once per schema)"""
+    names = set()
+    schemas = set()
+    for player in players:
+        data = player.get("performanceData")
+        if isinstance(data, PerformanceData):
+            schemas.add(data._schema)
+        elif data:
+            names.update(data.keys())
+    
+    for schema in schemas:
+        names.update(schema.keys)
+    return names
+
+def performance_matrix(players, metrics, fields=()):
+    """
+    Float matrix with one row per player and one column per name in metrics
+    (from performanceData) then fields (from the player), NaN where missing.
+    Packed metrics sharing a schema are copied straight from their float
+    arrays. Returns None when some player's metrics aren't packed or a field
+    isn't numeric, for callers to fall back to per-player parsing.
+    """
+    import numpy as np
+    
+    # Group rows by metric schema so each group is copied as one block
+    groups = {}
+    for row, player in enumerate(players):
+        data = player.get("performanceData")
+        if isinstance(data, PerformanceData):
+            rows, arrays = groups.setdefault(data._schema, ([], []))
+            rows.append(row)
+            arrays.append(data._values)
+        elif data:
+            return None
+    
+    matrix = np.full((len(players), len(metrics) + len(fields)), np.nan)
+    index = {metric: i for i, metric in enumerate(metrics)}
+    for schema, (rows, arrays) in groups.items():
+        pairs = [(i, index[key]) for i, key in enumerate(schema.keys) if key in index]
+        if not pairs:
+            continue
+        block = np.frombuffer(b"".join(arrays), dtype=np.float64).reshape(len(rows), len(schema.keys))
+        source, target = (list(side) for side in zip(*pairs))
+        matrix[np.asarray(rows)[:, None], target] = block[:, source]
+    
+    nan = float("nan")
+    for i, field in enumerate(fields, start=len(metrics)):
+        try:
+            matrix[:, i] = [player.get(field, nan) for player in players]
+        except (TypeError, ValueError):
+            return None
+    return matrix
+
+def file_version(path, chunk_size=1 << 20):
+    """sha256 of a file's contents, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class PlayerFileReader:
+    """
+    Streaming reader for a {"message": ..., "data": [players]} file. Players
+    are decoded one object at a time from a bounded text buffer, so the raw
+    file and the full parsed tree are never in memory at once. Top-level
+    fields other than "data" are kept in .fields after iteration.
+    """
+    def __init__(self, path, chunk_size=1 << 20):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.fields = {}
+        self._decoder = json.JSONDecoder()
+        self._digest = hashlib.sha256()
+    
+    @property
+    def version(self):
+        """sha256 of the bytes read so far (the whole file once iteration ends)"""
+        return self._digest.hexdigest()
+    
+    def _fill(self):
+        """Append the next chunk to the buffer; returns False at end of file"""
+        raw = self._file.read(self.chunk_size)
+        self._digest.update(raw)
+        self._buffer = self._buffer[self._pos:] + self._text.decode(raw, final=not raw)
+        self._pos = 0
+        return bool(raw)
+    
+    def _skip(self, expected=None):
+        """Skip whitespace and return the next character (consuming it if expected matches)"""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in " \t\r\n":
+                self._pos += 1
+            if self._pos < len(self._buffer) or not self._fill():
+                break
+        
+        char = self._buffer[self._pos] if self._pos < len(self._buffer) else ""
+        if expected is not None:
+            if not char or char not in expected:
+                raise ValueError(f"Expected {expected!r} at offset {self._pos} of {self.path}, found {char!r}")
+            self._pos += 1
+        return char
+    
+    def _value(self):
+        """Decode the next complete JSON value, reading more input as needed"""
+        self._skip()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            
+            # A value ending exactly at the buffer edge (e.g. a number) may continue in the next chunk
+            if end == len(self._buffer) and self._fill():
+                continue
+            self._pos = end
+            return value
+    
+    def __iter__(self):
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._pos = 0
+        
+        with open(self.path, "rb") as self._file:
+            yield from self._parse()
+            
+            # Drain any trailing bytes so the version covers the whole file
+            while self._fill():
+                pass
+    
+    def _parse(self):
+        self._skip("{")
+        if self._skip() == "}":
+            return
+        
+        while True:
+            key = self._value()
+            self._skip(":")
+            if key == "data":
+                self._skip("[")
+                if self._skip() == "]":
+                    self._pos += 1
+                else:
+                    while True:
+                        yield self._value()
+                        if self._skip(",]") == "]":
+                            break
+            else:
+                self.fields[key] = self._value()
+            
+            if self._skip(",}") == "}":
+                return
+
+def read_player_file(path):
+    """Stream a player file into compact records: returns (data dict, version)"""
+    reader = PlayerFileReader(path)
+    strings = {}
+    players = [compact_player(player, strings) for player in reader]
+    
+    data = dict(reader.fields)
+    data["data"] = players
+    return data, reader.version
+
+def load_cache(cache_path):
+    """Contents of a binary cache file ({version, stat_key, data}), or None if missing or unreadable"""
+    try:
+        with open(cache_path, "rb") as f:
+            cached = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError, ValueError):
+        return None
+    return cached if isinstance(cached, dict) and "data" in cached else None
+
+def write_cache(cache_path, data, version, stat_key):
+    """Write records to a binary cache file (atomically)"""
+    tmp_path = f"{cache_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(
+            {"version": version, "stat_key": tuple(stat_key), "data": data},
+            f, protocol=pickle.HIGHEST_PROTOCOL
+        )
+    os.replace(tmp_path, cache_path)
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Pre-convert a player JSON file to a binary record cache")
+    parser.add_argument("source", help="player JSON file")
+    parser.add_argument("cache", help="cache file to write")
+    args = parser.parse_args()
+    
+    data, version = read_player_file(args.source)
+    stat = os.stat(args.source)
+    write_cache(args.cache, data, version, (stat.st_mtime_ns, stat.st_size))
+    print(f"Wrote {len(data['data'])} players to {args.cache}")
@@ -0,0 +1,332 @@
+import bisect
+import hashlib
+import logging
+import os
+import pickle
+import threading
+from types import MappingProxyType
+
+from utils.context_builder import tokenize
+from utils.player_records import (
+    PlayerRecord, compact_player, file_version, load_cache, read_player_file, write_cache
+)
+
+logger = logging.getLogger(__name__)
+
+# Upper age bounds (exclusive) for the age-bucket index
+AGE_BUCKETS = [
+    (13, "U13"),
+    (15, "U15"),
+    (17, "U17"),
+    (19, "U19"),
+    (21, "U21"),
+    (23, "U23"),
+]
+
+GOALKEEPER_POSITIONS = {"حارس", "Goalkeeper"}
+DEFENCE_TERMS = ["دفاع", "ظهير", "defence", "defender", "back"]
+
+def position_category(position):
+    """Selector category for a position: Goalkeepers, Defenders or the position itself"""
+    if position in GOALKEEPER_POSITIONS:
+        return "Goalkeepers"
+    if any(term in str(position).lower() for term in DEFENCE_TERMS):
+        return "Defenders"
+    return position
+
+def age_bucket(age):
+    """Map an age to its age-bucket label"""
+    try:
+        age = int(age)
+    except (TypeError, ValueError):
+        return "Unknown"
+    
+    for upper, label in AGE_BUCKETS:
+        if age < upper:
+            return label
+    return "Senior"
+
+def player_fingerprint(player):
+    """Content hash of a player's fields, including performanceData"""
+    return hashlib.blake2b(pickle.dumps(sorted(player.items()), protocol=5), digest_size=16).hexdigest()
+
+class ChangeSet:
+    """Ids of players added, removed and changed by a reload"""
+    def __init__(self, added=(), removed=(), changed=()):
+        self.added = list(added)
+        self.removed = list(removed)
+        self.changed = list(changed)
+    
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+    
+    def __repr__(self):
+        return f"ChangeSet(added={len(self.added)}, removed={len(self.removed)}, changed={len(self.changed)})"
+
+class PlayerRepository:
+    """
+    Player data with id, position, position category, club and age-bucket
+    indexes plus a prefix-searchable inverted index over name, club and
+    county. Reloads are diffed by id using per-player fingerprints and only
+    added, removed and changed players touch the indexes. Everything handed
+    out is a read-only view so the same repository can be shared by every
+    session.
+    """
+    # Index name -> function giving a player's label in that index
+    GROUPINGS = {
+        "position": lambda player: player.get("position", "Unknown"),
+        "category": lambda player: position_category(player.get("position", "Unknown")),
+        "club": lambda player: player.get("clubName", "Unknown"),
+        "age_bucket": lambda player: age_bucket(player.get("age")),
+    }
+    
+    def __init__(self, data, version=None, path=None):
+        self.path = path
+        self._lock = threading.RLock()
+        self._listeners = []
+        
+        self._players = {}
+        self._fingerprints = {}
+        self._order_of = {}
+        self._by_order = {}
+        self._next_order = 0
+        self._groups = {kind: {} for kind in self.GROUPINGS}
+        self._groups["category"] = {"Goalkeepers": {}, "Defenders": {}}
+        self._frozen = {kind: {} for kind in self.GROUPINGS}
+        self._postings = {}
+        self._vocabulary = []
+        
+        self.apply(data, version)
+    
+    def subscribe(self, listener):
+        """Register listener(changes) to be called after each applied reload"""
+        with self._lock:
+            self._listeners.append(listener)
+    
+    @staticmethod
+    def _player_id(player):
+        return str(player.get("id", player.get("name")))
+    
+    @staticmethod
+    def _search_tokens(player):
+        return set(tokenize(f"{player.get('name', '')} {player.get('clubName', '')} {player.get('county', '')}"))
+    
+    def apply(self, data, version=None):
+        """Diff new file contents against the current players and update only what changed"""
+        # Players are stored as immutable compact records
+        incoming = {}
+        strings = {}
+        for player in data.get("data", []):
+            if not isinstance(player, PlayerRecord):
+                player = compact_player(player, strings)
+            incoming[self._player_id(player)] = player
+        
+        with self._lock:
+            removed = [player_id for player_id in self._players if player_id not in incoming]
+            added = [player_id for player_id in incoming if player_id not in self._players]
+            
+            # Deep equality is checked first; fingerprints are only computed for differing players
+            changed = [
+                player_id for player_id, player in incoming.items()
+                if player_id in self._players and self._players[player_id] != player
+                and self.fingerprint(player_id) != player_fingerprint(player)
+            ]
+            
+            dirty = {kind: set() for kind in self.GROUPINGS}
+            for player_id in removed + changed:
+                self._unindex(player_id, dirty)
+            for player_id in changed + added:
+                self._index(player_id, incoming[player_id], dirty)
+            
+            self.version = version
+            self.message = data.get("message")
+            changes = ChangeSet(added, removed, changed)
+            if changes or not hasattr(self, "players"):
+                self._publish(dirty)
+            listeners = list(self._listeners)
+        
+        if changes:
+            for listener in listeners:
+                listener(changes)
+        return changes
+    
+    def _index(self, player_id, player, dirty):
+        """Add a player to every index; changed players keep their file position"""
+        order = self._order_of.get(player_id)
+        if order is None:
+            order = self._next_order
+            self._next_order += 1
+            self._order_of[player_id] = order
+        
+        self._players[player_id] = player
+        self._by_order[order] = player
+        
+        for kind, label_of in self.GROUPINGS.items():
+            label = label_of(player)
+            self._groups[kind].setdefault(label, {})[order] = player
+            dirty[kind].add(label)
+        
+        for token in self._search_tokens(player):
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = set()
+                bisect.insort(self._vocabulary, token)
+            postings.add(order)
+    
+    def _unindex(self, player_id, dirty):
+        """Remove a player from every index"""
+        player = self._players.pop(player_id)
+        self._fingerprints.pop(player_id, None)
+        order = self._order_of[player_id]
+        del self._by_order[order]
+        
+        for kind, label_of in self.GROUPINGS.items():
+            label = label_of(player)
+            self._groups[kind][label].pop(order, None)
+            dirty[kind].add(label)
+        
+        for token in self._search_tokens(player):
+            postings = self._postings[token]
+            postings.discard(order)
+            if not postings:
+                del self._postings[token]
+                del self._vocabulary[bisect.bisect_left(self._vocabulary, token)]
+    
+    def _publish(self, dirty):
+        """Rebuild the read-only views, re-freezing only the groups that changed"""
+        for kind, labels in dirty.items():
+            frozen = self._frozen[kind]
+            for label in labels:
+                members = self._groups[kind].get(label)
+                if members:
+                    # Group members are keyed by file order
+                    frozen[label] = tuple(members[order] for order in sorted(members))
+                else:
+                    frozen.pop(label, None)
+        
+        # Orders of removed players are never reused, so sorting keeps file order
+        self.players = tuple(self._by_order[order] for order in sorted(self._by_order))
+        self.by_id = MappingProxyType(dict(self._players))
+        self.by_position = MappingProxyType(dict(self._frozen["position"]))
+        self.by_category = MappingProxyType({
+            label: self._frozen["category"][label]
+            for label in self._groups["category"] if label in self._frozen["category"]
+        })
+        self.by_club = MappingProxyType(dict(self._frozen["club"]))
+        self.by_age_bucket = MappingProxyType(dict(self._frozen["age_bucket"]))
+    
+    def fingerprint(self, player_id):
+        """Content fingerprint of a player (computed on first use), or None if unknown"""
+        player_id = str(player_id)
+        with self._lock:
+            fingerprint = self._fingerprints.get(player_id)
+            if fingerprint is None and player_id in self._players:
+                fingerprint = self._fingerprints[player_id] = player_fingerprint(self._players[player_id])
+            return fingerprint
+    
+    def search(self, query):
+        """
+        Players whose name, club or county contain a word starting with every
+        query token, in repository order
+        """
+        with self._lock:
+            matches = None
+            for token in set(tokenize(query)):
+                start = bisect.bisect_left(self._vocabulary, token)
+                end = bisect.bisect_left(self._vocabulary, token + "\uffff")
+                
+                token_matches = set()
+                for word in self._vocabulary[start:end]:
+                    token_matches.update(self._postings[word])
+                
+                matches = token_matches if matches is None else matches & token_matches
+                if not matches:
+                    return []
+            
+            if matches is None:
+                return list(self.players)
+            return [self._by_order[order] for order in sorted(matches)]
+    
+    def position_of(self, player):
+        """Index of a player in file order (for stable sorting)"""
+        return self._order_of.get(self._player_id(player), self._next_order)
+    
+    def get(self, player_id, default=None):
+        """Look up a player by id"""
+        return self.by_id.get(str(player_id), default)
+    
+    def __len__(self):
+        return len(self.players)
+    
+    def __iter__(self):
+        return iter(self.players)
+
+class _Entry:
+    """Registry entry remembering which file state a repository was built from"""
+    def __init__(self, repository, stat_key):
+        self.repository = repository
+        self.stat_key = stat_key
+
+_repositories = {}
+_lock = threading.Lock()
+
+def _stat_key(path):
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+def load_player_repository(path="data.json", cache_path=None):
+    """
+    Return the shared repository for a data file, re-reading it only when the
+    file's mtime changes and re-indexing only players whose content changed.
+    The file is streamed into compact records; with cache_path, a binary
+    cache of those records is used for cold starts and kept up to date. A
+    file that no longer parses (e.g. caught mid-rewrite) keeps the previous
+    repository until a later call reads it successfully.
+    """
+    path = os.path.abspath(path)
+    stat_key = _stat_key(path)
+    
+    with _lock:
+        entry = _repositories.get(path)
+        if entry is not None and entry.stat_key == stat_key:
+            return entry.repository
+        
+        data = None
+        version = None
+        if entry is not None:
+            version = file_version(path)
+            
+            # A touched but unchanged file keeps the existing repository
+            if entry.repository.version == version:
+                entry.stat_key = stat_key
+                return entry.repository
+        elif cache_path:
+            # A cache built from this file (same stat, or same content) skips parsing
+            cached = load_cache(cache_path)
+            if cached is not None:
+                if tuple(cached.get("stat_key", ())) != stat_key:
+                    version = file_version(path)
+                if version is None or cached.get("version") == version:
+                    data, version = cached["data"], cached["version"]
+        
+        if data is None:
+            try:
+                data, version = read_player_file(path)
+            except ValueError as e:
+                if entry is None:
+                    raise
+                # Likely caught mid-rewrite: keep serving the last good data and retry on the next call
+                logger.warning("Could not parse %s, keeping the previous players: %s", path, e)
+                return entry.repository
+            if cache_path:
+                write_cache(cache_path, data, version, stat_key)
+        
+        # A changed file is diffed into the existing repository player by player
+        if entry is not None:
+            entry.repository.apply(data, version)
+            entry.stat_key = stat_key
+            return entry.repository
+        
+        repository = PlayerRepository(data, version=version, path=path)
+        _repositories[path] = _Entry(repository, stat_key)
+        return repository
@@ -0,0 +1,163 @@
+import random
+import threading
+import time
+
+# HTTP status codes worth retrying: quota, timeouts and transient server errors
+RETRYABLE_CODES = {408, 429, 500, 502, 503, 504}
+
+# Status codes that mean "slow down" rather than "broken"
+OVERLOAD_CODES = {429, 503}
+
+# google.api_core exception names, for errors that carry no numeric code
+RETRYABLE_NAMES = {
+    "ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "InternalServerError",
+    "DeadlineExceeded", "GatewayTimeout", "BadGateway", "Aborted",
+}
+
+class CircuitOpenError(Exception):
+    """Raised without calling the API while the circuit breaker is open"""
+
+def error_code(error):
+    """HTTP-style status code of an API error, if it carries one"""
+    for attribute in ("code", "status_code"):
+        code = getattr(error, attribute, None)
+        code = code() if callable(code) else code
+        code = getattr(code, "value", code)
+        if isinstance(code, int):
+            return code
+    return None
+
+def is_retryable(error):
+    """Whether an API error is transient (quota, timeout, 5xx, connection)"""
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    return error_code(error) in RETRYABLE_CODES or type(error).__name__ in RETRYABLE_NAMES
+
+def is_overload(error):
+    """Whether an API error signals we are sending too much"""
+    return error_code(error) in OVERLOAD_CODES or type(error).__name__ in {"ResourceExhausted", "TooManyRequests"}
+
+def backoff_delay(attempt, base=0.5, cap=20.0):
+    """Full-jitter exponential backoff for a 0-based retry attempt"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+class TokenBucket:
+    """
+    Request rate limiter: tokens refill at rate per second up to capacity
+    and every request takes one, blocking until one is available.
+    """
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        """Take a token, returning the seconds spent waiting"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+class AdaptiveConcurrency:
+    """
+    AIMD limit on in-flight requests: each success raises the limit by
+    about one per window of requests, and an overload error halves it (at
+    most once per cooldown, so a burst of 429s counts once).
+    """
+    def __init__(self, initial=4, minimum=1, maximum=32, decrease=0.5, cooldown=1.0):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.limit = float(max(minimum, min(initial, maximum)))
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+    
+    def acquire(self):
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+    
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify()
+    
+    def on_success(self):
+        with self._cond:
+            if self.limit < self.maximum:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+                self._cond.notify()
+    
+    def on_overload(self):
+        with self._cond:
+            now = time.monotonic()
+            if now - self._last_decrease >= self.cooldown:
+                self.limit = max(self.minimum, self.limit * self.decrease)
+                self._last_decrease = now
+
+class CircuitBreaker:
+    """
+    Fails fast during outages: after failure_threshold consecutive
+    failures the circuit opens for reset_timeout seconds, then lets a
+    single probe through (half-open) and closes again once it succeeds.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+    
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go ahead"""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    raise CircuitOpenError("The AI service is temporarily unavailable; please try again shortly.")
+                self.state = self.HALF_OPEN
+                self._probing = False
+            
+            if self.state == self.HALF_OPEN:
+                if self._probing:
+                    raise CircuitOpenError("The AI service is recovering; please try again shortly.")
+                self._probing = True
+    
+    def on_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+            self._probing = False
+    
+    def on_abandon(self):
+        """A call ended without an outcome; let another probe through if it was one"""
+        with self._lock:
+            self._probing = False
+    
+    def on_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probing = False
@@ -0,0 +1,114 @@
+import hashlib
+import sqlite3
+import threading
+import time
+
+class ResponseCache:
+    """
+    Persistent, content-addressed cache for LLM responses backed by SQLite.
+    Entries are keyed by a hash of the model name and the prompt, expire after
+    a TTL and are evicted least-recently-used once max_entries is exceeded.
+    """
+    def __init__(self, path="llm_cache.sqlite3", ttl=7 * 24 * 3600, max_entries=5000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        
+        # Counters for this process
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                tag TEXT,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_access ON responses(last_access)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_tag ON responses(tag)")
+    
+    @staticmethod
+    def make_key(model, prompt):
+        """Content address for a model/prompt pair"""
+        return hashlib.sha256(f"{model}\0{prompt}".encode("utf-8")).hexdigest()
+    
+    def get(self, model, prompt):
+        """Return the cached response or None on a miss"""
+        key = self.make_key(model, prompt)
+        now = time.time()
+        
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            
+            if row is None:
+                self.misses += 1
+                return None
+            
+            response, created_at = row
+            if self.ttl is not None and now - created_at > self.ttl:
+                # Expired entries count as misses and are dropped right away
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return response
+    
+    def put(self, model, prompt, response, tag=None):
+        """Store a response, evicting the least recently used entries if needed"""
+        key = self.make_key(model, prompt)
+        now = time.time()
+        
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, tag, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, response, tag, now, now)
+            )
+            
+            if self.max_entries is not None:
+                count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+                overflow = count - self.max_entries
+                if overflow > 0:
+                    self._conn.execute(
+                        "DELETE FROM responses WHERE key IN "
+                        "(SELECT key FROM responses ORDER BY last_access LIMIT ?)",
+                        (overflow,)
+                    )
+                    self.evictions += overflow
+    
+    def invalidate_tag(self, tag):
+        """Drop every entry stored under a tag (e.g. a player id)"""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE tag = ?", (tag,))
+    
+    def stats(self):
+        """Hit/miss counters and current size"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries
+        }
+    
+    def clear(self):
+        """Remove every cached response"""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
@@ -0,0 +1,213 @@
+import threading
+
+import numpy as np
+
+from utils.player_records import metric_names, performance_matrix
+from utils.player_repository import position_category
+
+# Profile fields used alongside every performanceData metric
+PROFILE_FIELDS = ["tps", "height", "weight", "age"]
+
+class SimilarityEngine:
+    """
+    Nearest-neighbour search over player profiles. Each player's
+    performanceData metrics, tps, height, weight and age are z-scored per
+    feature (missing values count as average) and stored as unit vectors in
+    one float32 matrix, so a query is a single matrix-vector product
+    (cosine similarity) plus a partial sort. Changed players only rewrite
+    their own rows; the feature scaling is refreshed once enough rows have
+    changed since it was last computed.
+    """
+    def __init__(self, players, rescale_fraction=0.1):
+        self._lock = threading.RLock()
+        self.rescale_fraction = rescale_fraction
+        
+        self.features = sorted(metric_names(players)) + PROFILE_FIELDS
+        self._feature_index = {feature: i for i, feature in enumerate(self.features)}
+        
+        self._rows = {}
+        self._ids = []
+        self._size = 0
+        self._categories = {}
+        capacity = max(len(players), 1)
+        self._values = np.full((capacity, len(self.features)), np.nan)
+        self._unit = np.zeros((capacity, len(self.features)), dtype=np.float32)
+        self._valid = np.zeros(capacity, dtype=bool)
+        self._category = np.full(capacity, -1, dtype=np.int32)
+        
+        self._load(players)
+        self._rescale()
+    
+    def _load(self, players):
+        """Bulk-fill the raw feature matrix in one pass"""
+        perf_metrics = self.features[:-len(PROFILE_FIELDS)]
+        for row, player in enumerate(players):
+            player_id = str(player.get("id", player.get("name")))
+            self._rows[player_id] = row
+            self._ids.append(player_id)
+        
+        # Packed records are copied as whole arrays; anything else is read metric by metric
+        values = performance_matrix(players, perf_metrics, PROFILE_FIELDS)
+        if values is None:
+            nan = float("nan")
+            rows = []
+            for player in players:
+                data = player.get("performanceData") or {}
+                rows.append([data.get(metric, nan) for metric in perf_metrics] +
+                            [player.get(field, nan) for field in PROFILE_FIELDS])
+            
+            try:
+                values = np.array(rows, dtype=float).reshape(len(rows), len(self.features))
+            except (TypeError, ValueError):
+                # Fall back to per-player parsing when some values aren't numeric
+                values = np.array([self._player_vector(player) for player in players]).reshape(len(rows), len(self.features))
+        
+        self._size = len(players)
+        self._values[:self._size] = values
+        self._valid[:self._size] = True
+        self._category[:self._size] = [self._code(self.category_of(player)) for player in players]
+    
+    @staticmethod
+    def category_of(player):
+        """Position category a player is compared within"""
+        return position_category(player.get("position", "Unknown"))
+    
+    def _player_vector(self, player):
+        """Raw feature vector for a player, NaN where a value is missing"""
+        vector = np.full(len(self.features), np.nan)
+        data = dict(player.get("performanceData") or {})
+        for field in PROFILE_FIELDS:
+            data[field] = player.get(field)
+        
+        for feature, value in data.items():
+            i = self._feature_index.get(feature)
+            if i is None:
+                continue
+            try:
+                vector[i] = float(value)
+            except (TypeError, ValueError):
+                pass
+        return vector
+    
+    def _code(self, category):
+        if category not in self._categories:
+            self._categories[category] = len(self._categories)
+        return self._categories[category]
+    
+    def _normalize(self, values):
+        """Unit-length z-scored rows (missing features contribute nothing)"""
+        z = np.nan_to_num((values - self._mean) / self._std)
+        norms = np.linalg.norm(z, axis=1, keepdims=True)
+        return np.divide(z, norms, out=np.zeros_like(z), where=norms > 0).astype(np.float32)
+    
+    def _rescale(self):
+        """Recompute the per-feature scaling and every unit vector"""
+        values = self._values[:self._size][self._valid[:self._size]]
+        counts = np.maximum((~np.isnan(values)).sum(axis=0), 1)
+        mean = np.nansum(values, axis=0) / counts
+        std = np.sqrt(np.nansum((values - mean) ** 2, axis=0) / counts)
+        self._mean = mean
+        self._std = np.where(std > 0, std, 1.0)
+        
+        self._unit[:self._size] = self._normalize(self._values[:self._size])
+        self._unit[:self._size][~self._valid[:self._size]] = 0
+        self._changed = 0
+    
+    def _grow(self, capacity):
+        extra = capacity - self._values.shape[0]
+        self._values = np.vstack([self._values, np.full((extra, len(self.features)), np.nan)])
+        self._unit = np.vstack([self._unit, np.zeros((extra, len(self.features)), dtype=np.float32)])
+        self._valid = np.concatenate([self._valid, np.zeros(extra, dtype=bool)])
+        self._category = np.concatenate([self._category, np.full(extra, -1, dtype=np.int32)])
+    
+    def _write_row(self, player):
+        """Store a player's vector, growing the matrices when full"""
+        player_id = str(player.get("id", player.get("name")))
+        row = self._rows.get(player_id)
+        
+        if row is None:
+            row = self._size
+            if row >= self._values.shape[0]:
+                self._grow(row * 2)
+            self._rows[player_id] = row
+            self._ids.append(player_id)
+            self._size += 1
+        
+        self._values[row] = self._player_vector(player)
+        self._unit[row] = self._normalize(self._values[row:row + 1])[0]
+        self._valid[row] = True
+        self._category[row] = self._code(self.category_of(player))
+    
+    def apply_changes(self, updated_players, removed_ids=()):
+        """Apply a batch of updates and removals, rescaling only after large drifts"""
+        with self._lock:
+            for player_id in removed_ids:
+                row = self._rows.pop(str(player_id), None)
+                if row is None:
+                    continue
+                # The row is left empty and never matched again
+                self._values[row] = np.nan
+                self._unit[row] = 0
+                self._valid[row] = False
+                self._category[row] = -1
+                self._changed += 1
+            
+            for player in updated_players:
+                self._write_row(player)
+                self._changed += 1
+            
+            if self._changed > self.rescale_fraction * max(len(self._rows), 1):
+                self._rescale()
+    
+    def __len__(self):
+        return len(self._rows)
+    
+    def similar(self, player_id, k=5, category=None, min_age=None, max_age=None):
+        """
+        The k players most similar to player_id as [(player_id, similarity)],
+        best first, optionally limited to one position category and an age range
+        """
+        with self._lock:
+            row = self._rows.get(str(player_id))
+            if row is None:
+                return []
+            
+            size = self._size
+            mask = self._valid[:size].copy()
+            mask[row] = False
+            if category is not None:
+                mask &= self._category[:size] == self._categories.get(category, -2)
+            
+            ages = self._values[:size, self._feature_index["age"]]
+            with np.errstate(invalid="ignore"):
+                if min_age is not None:
+                    mask &= ages >= min_age
+                if max_age is not None:
+                    mask &= ages <= max_age
+            
+            candidates = np.flatnonzero(mask)
+            if not len(candidates) or k <= 0:
+                return []
+            
+            scores = (self._unit[:size] @ self._unit[row])[candidates]
+            if len(candidates) > k:
+                top = np.argpartition(-scores, k - 1)[:k]
+            else:
+                top = np.arange(len(candidates))
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return [(self._ids[candidates[i]], float(scores[i])) for i in top]
+    
+    def format_for_prompt(self, player, repository, k=5):
+        """Compact list of the players most like player (same position category) for LLM prompts"""
+        matches = self.similar(player.get("id", player.get("name")), k=k, category=self.category_of(player))
+        
+        lines = []
+        for player_id, score in matches:
+            match = repository.get(player_id)
+            if match is not None:
+                lines.append(
+                    f"- {match.get('name', 'Unknown')} ({match.get('position', 'Unknown')}, "
+                    f"age {match.get('age', 'N/A')}, {match.get('clubName', 'Unknown')}): "
+                    f"similarity {score:.2f}"
+                )
+        return "\n".join(lines)
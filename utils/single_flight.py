@@ -0,0 +1,138 @@
+import threading
+
+class FlightAbandoned(Exception):
+    """Raised to followers when the leading caller stopped before its request completed"""
+
+class _Flight:
+    """One in-flight request: the chunks produced so far and how it ended"""
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.followers = 0
+        self.cond = threading.Condition()
+
+class SingleFlight:
+    """
+    Collapses concurrent identical requests into one. The first caller for a
+    key (the leader) runs the request; callers arriving while it is still in
+    flight wait for it and receive the same result, chunk by chunk for
+    streams. Keys are forgotten once the request completes, so later callers
+    start a new request (or, in practice, hit the response cache).
+    """
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+        
+        # Counters for this process
+        self.leaders = 0
+        self.followers = 0
+    
+    @property
+    def in_flight(self):
+        with self._lock:
+            return len(self._flights)
+    
+    def _join(self, key):
+        """Return (flight, is_leader) for a key, starting a flight if none is running"""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                self.leaders += 1
+                return flight, True
+            self.followers += 1
+            flight.followers += 1
+            return flight, False
+    
+    def _push(self, flight, chunk):
+        with flight.cond:
+            flight.chunks.append(chunk)
+            flight.cond.notify_all()
+    
+    def _land(self, key, flight, error=None):
+        """Mark a flight finished and wake its followers"""
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        with flight.cond:
+            flight.done = True
+            flight.error = error
+            flight.cond.notify_all()
+    
+    def _follow(self, flight):
+        """Yield a flight's chunks as they arrive, re-raising its error if it failed"""
+        position = 0
+        while True:
+            with flight.cond:
+                while position >= len(flight.chunks) and not flight.done:
+                    flight.cond.wait()
+                chunks = flight.chunks[position:]
+                done, error = flight.done, flight.error
+            
+            yield from chunks
+            position += len(chunks)
+            if done:
+                if error is not None:
+                    raise error
+                return
+    
+    def _drain(self, key, flight, chunks):
+        """Publish the rest of a request's chunks with nobody consuming them locally"""
+        try:
+            for chunk in chunks:
+                self._push(flight, chunk)
+        except Exception as e:
+            self._land(key, flight, e)
+            return
+        self._land(key, flight)
+    
+    def _lead(self, key, flight, request):
+        """Run the request, publishing every chunk to the flight as it is yielded"""
+        chunks = None
+        try:
+            chunks = iter(request())
+            for chunk in chunks:
+                self._push(flight, chunk)
+                yield chunk
+        except Exception as e:
+            self._land(key, flight, e)
+            raise
+        except BaseException:
+            # The leader's consumer stopped early: finish the request in the background for
+            # anyone waiting on it, or drop it if nobody is
+            with self._lock:
+                waiting = flight.followers
+            if waiting and chunks is not None:
+                threading.Thread(target=self._drain, args=(key, flight, chunks), daemon=True).start()
+            else:
+                self._land(key, flight, FlightAbandoned("The shared request was abandoned before it completed"))
+            raise
+        self._land(key, flight)
+    
+    def stream(self, key, request):
+        """
+        Yield the chunks of request() (an iterable), sharing one request among
+        concurrent callers with the same key.
+        """
+        while True:
+            flight, leader = self._join(key)
+            if leader:
+                yield from self._lead(key, flight, request)
+                return
+            
+            received = False
+            try:
+                for chunk in self._follow(flight):
+                    received = True
+                    yield chunk
+                return
+            except FlightAbandoned:
+                # The leader gave up before anyone joined; nothing was passed on yet, so take over
+                if received:
+                    raise
+    
+    def do(self, key, request):
+        """Return request(), sharing one call among concurrent callers with the same key"""
+        results = list(self.stream(key, lambda: [request()]))
+        return results[0]
@@ -0,0 +1,67 @@
+class Transcript:
+    """
+    Chat history for one session. Analysis texts are stored once, keyed by a
+    reference unique to the analysis turn (<player id>:<job id>, or
+    team:<job id>), and messages point at them instead of holding a copy.
+    SharedMemory only keeps each player's latest analysis, shared by every
+    session, so earlier turns keep their own text here. Only the newest
+    max_messages are kept: older turns are compacted away together with any
+    analysis no longer referenced.
+    """
+    def __init__(self, max_messages=200):
+        self.max_messages = max_messages
+        self.messages = []
+        self.analyses = {}
+        self.compacted = 0
+    
+    def __len__(self):
+        return len(self.messages)
+    
+    def add(self, role, content):
+        """Append a plain chat message"""
+        self.messages.append({"role": role, "content": content})
+        self._compact()
+    
+    def add_analysis(self, ref, request, analysis):
+        """Append an analysis turn: the request and a reference to the stored analysis"""
+        self.analyses[ref] = analysis
+        self.messages.append({"role": "user", "content": request})
+        self.messages.append({"role": "assistant", "ref": ref})
+        self._compact()
+    
+    def analysis(self, ref, default=None):
+        """Stored text of an analysis"""
+        return self.analyses.get(ref, default)
+    
+    def content(self, message):
+        """Text of a message, resolving analysis references"""
+        ref = message.get("ref")
+        return message["content"] if ref is None else self.analyses.get(ref, "")
+    
+    def recent(self, count):
+        """The newest count messages as {"role", "content"} dicts"""
+        start = max(0, len(self.messages) - count)
+        return [
+            {"role": message["role"], "content": self.content(message)}
+            for message in self.messages[start:]
+        ]
+    
+    def _compact(self):
+        """Drop the oldest turns beyond max_messages, and analyses only they referenced"""
+        cut = len(self.messages) - self.max_messages
+        if cut <= 0:
+            return
+        
+        # Cut at a user message so no response is kept without its request
+        while cut < len(self.messages) and self.messages[cut]["role"] != "user":
+            cut += 1
+        
+        dropped = self.messages[:cut]
+        del self.messages[:cut]
+        self.compacted += len(dropped)
+        
+        refs = {message["ref"] for message in dropped if "ref" in message}
+        if refs:
+            refs -= {message["ref"] for message in self.messages if "ref" in message}
+            for ref in refs:
+                self.analyses.pop(ref, None)